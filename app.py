@@ -1,6 +1,5 @@
-from flask import Flask, render_template, request
-# Import your T5 model and tokenizer (assuming you use Hugging Face transformers)
-from transformers import T5ForConditionalGeneration, T5Tokenizer
+import contextlib, json, logging, os, threading
+from flask import Flask, Response, jsonify, render_template, request
 
 # Import your normalization functions
 from normalization import (
@@ -20,28 +19,253 @@ from normalization import (
     normalizeString_cuneiform,
     normalizeString_cuneiform_transliterate_translate,
     normalizeString_en,
+    normalizer_cache_stats,
     trim_singles
 )
+from incremental import match_lines, split_lines, translate_document
+from model_registry import ModelRegistry
+from metrics import CONTENT_TYPE, TOKEN_BUCKETS, MetricsRegistry, RequestTrace
+from prompts import PROMPT_STYLES, prompt_style_of
+from scheduler import BatchScheduler
+from segmentation import join_translations, segment_prompts
+from translation_cache import SQLiteTranslationCache, TranslationCache, make_cache_key
 
 
 
 app = Flask(__name__)
 
-# Load your T5 model (replace 'your-t5-model' with your actual model name/path)
-model_name = "Thalesian/AKK_60m"
-tokenizer = T5Tokenizer.from_pretrained(model_name)
-model = T5ForConditionalGeneration.from_pretrained(model_name)
-
-# Define your available prompt styles
-PROMPT_STYLES = {
-    "Translate cuneiform": "Translate Akkadian cuneiform to English: ",
-    "Translate transliteration": "Translate complex Akkadian transliteration to English: ",
-    "Translate uncertain transliteration": "Translate simple Akkadian transliteration to English: ",
-    "Translate English to cuneiform": "Translate English to Akkadian cuneiform: ",
-    "Translate English to transliteration": "Translate English to complex Akkadian transliteration: ",
-    "Transliterate cuneiform": "Transliterate Akkadian cuneiform to complex Latin characters: "
+# Your T5 model (replace 'your-t5-model' with your actual model name/path)
+# and the inference backend to run it with: "torch", "quantized" or "onnx"
+# (see backends.py), optionally with AKK_DRAFT_MODEL, a smaller local model
+# with the same vocabulary drafting tokens for assisted generation (torch
+# and quantized backends only).  To serve several models, routed by prompt
+# style and loaded and unloaded within a memory budget, point AKK_MODELS at
+# a JSON configuration instead (see model_registry.py).  Models are loaded
+# on first use, or the default one up front by warm_up(), so importing this
+# module stays cheap.
+if os.environ.get("AKK_MODELS"):
+    registry = ModelRegistry.from_config(os.environ["AKK_MODELS"])
+else:
+    registry = ModelRegistry.single(
+        os.environ.get("AKK_MODEL", "Thalesian/AKK_60m"),
+        backend=os.environ.get("AKK_BACKEND", "torch"),
+        draft_model=os.environ.get("AKK_DRAFT_MODEL") or None,
+    )
+
+# Decoding options of every generation (see translate_batch): outputs are
+# capped at AKK_LENGTH_RATIO times the input tokens plus AKK_LENGTH_MARGIN,
+# and a prompt whose output repeats itself over AKK_REPETITION_GUARD tokens
+# is stopped there (0 disables either), so short or noisy inputs cannot run
+# on to max_length.
+DECODING_OPTIONS = {
+    "length_ratio": float(os.environ.get("AKK_LENGTH_RATIO", 3.0)),
+    "length_margin": int(os.environ.get("AKK_LENGTH_MARGIN", 16)),
+    "repetition_guard": int(os.environ.get("AKK_REPETITION_GUARD", 16)),
 }
 
+# Stage timings, batch sizes and token counts, served at /metrics.  Set
+# AKK_LOG_REQUESTS=1 to also log every request's timings as a JSON line.
+metrics = MetricsRegistry()
+REQUEST_SECONDS = metrics.histogram(
+    "akk_request_stage_seconds", "Time spent per request in each stage (load, normalize, translate, generate, render, total).",
+    ["route", "prompt_style", "stage"],
+)
+BATCH_STAGE_SECONDS = metrics.histogram(
+    "akk_batch_stage_seconds", "Time spent per generate batch in tokenize, encode, decode and detokenize.", ["stage"],
+)
+BATCH_SIZE = metrics.histogram("akk_batch_size", "Prompts per translate call (one or more generate batches).", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+INPUT_TOKENS = metrics.histogram("akk_input_tokens", "Input tokens per translated prompt.", ["prompt_style"], buckets=TOKEN_BUCKETS)
+OUTPUT_TOKENS = metrics.histogram("akk_output_tokens", "Output tokens per translated prompt.", ["prompt_style"], buckets=TOKEN_BUCKETS)
+REQUESTS = metrics.counter("akk_requests_total", "Translation requests served.", ["route", "prompt_style"])
+CACHE_LOOKUPS = metrics.counter("akk_cache_lookups_total", "Translation cache lookups.", ["result"])
+CACHE_ENTRIES = metrics.gauge("akk_cache_entries", "Translations currently cached.")
+MODEL_READY = metrics.gauge("akk_model_ready", "1 while the model is loaded.", ["model"])
+MODEL_MEMORY = metrics.gauge("akk_model_memory_bytes", "Estimated memory of each model when loaded.", ["model"])
+MODEL_LOADS = metrics.counter("akk_model_loads_total", "Times each model has been loaded.", ["model"])
+MODEL_EVICTIONS = metrics.counter("akk_model_evictions_total", "Times each model has been unloaded to stay within the memory budget.", ["model"])
+GENERATIONS = metrics.counter(
+    "akk_generations_total", "Prompts generated, by why generation stopped (eos, length, repetition) and decoding (standard, assisted).",
+    ["prompt_style", "stop_reason", "decoding"],
+)
+LENGTH_CAPS = metrics.histogram("akk_output_length_cap", "Output length cap per generated prompt, in tokens.", ["prompt_style"], buckets=TOKEN_BUCKETS)
+DOCUMENT_LINES = metrics.counter("akk_document_lines_total", "Lines of documents submitted with an ID, by whether they were translated or reused.", ["result"])
+NORMALIZER_LOOKUPS = metrics.counter("akk_normalizer_cache_lookups_total", "Normalizer line cache lookups.", ["normalizer", "result"])
+
+request_logger = None
+if os.environ.get("AKK_LOG_REQUESTS"):
+    request_logger = logging.getLogger("akk.requests")
+    request_logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    request_logger.addHandler(handler)
+
+def _style_label(prompt_key):
+    # Only known styles become label values, so metrics stay bounded
+    return prompt_key if prompt_key in PROMPT_STYLES else "other"
+
+def _trace(route, prompt_key):
+    style = _style_label(prompt_key)
+    REQUESTS.inc(route=route, prompt_style=style)
+    return RequestTrace(route, style, REQUEST_SECONDS, request_logger)
+
+def _load(model, trace):
+    # Models are loaded only once there is something to generate with them;
+    # a request that has to load one records it as its own stage
+    if trace is not None and not registry.ready(model):
+        with trace.span("load"):
+            registry.get(model)
+
+def _translate(texts, bucketed=False, model=None, **kwargs):
+    stats = {}
+    backend = registry.get(model)
+    translate = backend.translate_bucketed if bucketed else backend.translate
+    translations = translate(texts, stats=stats, **kwargs)
+    BATCH_SIZE.observe(len(texts))
+    for stage, seconds in stats["seconds"].items():
+        BATCH_STAGE_SECONDS.observe(seconds, stage=stage)
+    decoding = "assisted" if stats["assisted"] else "standard"
+    per_prompt = zip(texts, stats["input_tokens"], stats["output_tokens"], stats["length_caps"], stats["stop_reasons"])
+    for text, input_tokens, output_tokens, length_cap, stop_reason in per_prompt:
+        style = prompt_style_of(text, registry.languages)
+        INPUT_TOKENS.observe(input_tokens, prompt_style=style)
+        OUTPUT_TOKENS.observe(output_tokens, prompt_style=style)
+        LENGTH_CAPS.observe(length_cap, prompt_style=style)
+        GENERATIONS.inc(prompt_style=style, stop_reason=stop_reason, decoding=decoding)
+    return translations
+
+def warm_up():
+    """
+    Load the default model and run one short generation so the first real
+    request does not pay for it.  Other models load when first used.
+    """
+    registry.get().translate([PROMPT_STYLES["Translate cuneiform"]], max_length=8)
+
+def warm_up_in_background():
+    thread = threading.Thread(target=warm_up, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Concurrent requests are collected for up to BATCH_MAX_WAIT_MS milliseconds
+# (or BATCH_MAX_SIZE requests) and translated with one padded generate call.
+BATCH_MAX_SIZE = int(os.environ.get("AKK_BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.environ.get("AKK_BATCH_MAX_WAIT_MS", 10))
+scheduler = BatchScheduler(
+    _translate,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+)
+
+# Translations are cached on the normalized prompt, model and generation
+# parameters.  Set AKK_CACHE_PATH to keep them in SQLite across restarts.
+CACHE_SIZE = int(os.environ.get("AKK_CACHE_SIZE", 4096))
+CACHE_TTL = float(os.environ["AKK_CACHE_TTL"]) if os.environ.get("AKK_CACHE_TTL") else None
+CACHE_PATH = os.environ.get("AKK_CACHE_PATH")
+if CACHE_PATH:
+    cache = SQLiteTranslationCache(CACHE_PATH, maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+else:
+    cache = TranslationCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+
+# Inputs longer than SEGMENT_MAX_TOKENS prompt tokens are split into
+# segments (see segmentation.py) that are translated together and joined.
+SEGMENT_MAX_TOKENS = int(os.environ.get("AKK_SEGMENT_MAX_TOKENS", 256))
+
+# The segments of recent inputs, so that a repeated input (typically one
+# answered from the cache) is not tokenized again
+segment_cache = TranslationCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+
+def _segment(text, prompt_key):
+    # Measured with, and in the language of, the model serving the style
+    model = registry.route(prompt_key)
+    entry = registry.entry(model)
+    key = make_cache_key(text, entry.path, prompt_key=prompt_key, max_size=SEGMENT_MAX_TOKENS)
+    segments = segment_cache.get(key)
+    if segments is None:
+        # The tokenizer alone, so that measuring never loads or evicts a model
+        tokenizer = entry.tokenizer
+        segments = tuple(segment_prompts(
+            text, prompt_key, SEGMENT_MAX_TOKENS, measure=lambda s: len(tokenizer.tokenize(s)),
+            language=entry.language,
+        ))
+        segment_cache.set(key, segments)
+    return list(segments)
+
+# Submissions with a document_id are translated line by line, and only the
+# lines changed since that document's previous submission are generated
+# again (see incremental.py).  The last version of up to
+# AKK_DOCUMENT_STORE_SIZE documents is kept.
+documents = TranslationCache(maxsize=int(os.environ.get("AKK_DOCUMENT_STORE_SIZE", 1024)), ttl=CACHE_TTL)
+
+def _segment_lines(text, prompt_key):
+    # One tuple of segment prompts per line, empty for blank lines
+    return [tuple(_segment(line, prompt_key)) if line.strip() else () for line in split_lines(text)]
+
+def _count_lines(lines, changed):
+    translated = len(changed)
+    DOCUMENT_LINES.inc(translated, result="translated")
+    DOCUMENT_LINES.inc(sum(1 for line in lines if line) - translated, result="reused")
+
+# At most MAX_PENDING requests per process may be waiting for generation
+# (0: no limit); beyond that they are turned away with a 503 instead of
+# queueing without bound.  Cached translations are always served.
+MAX_PENDING = int(os.environ.get("AKK_MAX_PENDING", 0))
+_pending = threading.BoundedSemaphore(MAX_PENDING) if MAX_PENDING else None
+
+class ServerBusy(Exception):
+    pass
+
+def _acquire_slot():
+    if _pending is not None and not _pending.acquire(blocking=False):
+        raise ServerBusy()
+
+def _release_slot():
+    if _pending is not None:
+        _pending.release()
+
+@contextlib.contextmanager
+def _generation_slot():
+    _acquire_slot()
+    try:
+        yield
+    finally:
+        _release_slot()
+
+@app.errorhandler(ServerBusy)
+def server_busy(error):
+    response = jsonify({"error": "too many pending translations, retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+def translate_prompts(prompts, model=None, use_scheduler=False, trace=None, **generate_kwargs):
+    """
+    Translate normalized prompts with ``model`` (a registry name, default:
+    the default model), answering from the cache where possible; the model
+    is loaded (timed in ``trace``) only if some prompt is not cached.
+    Each distinct uncached prompt is translated once, in the scheduler's
+    next batch if ``use_scheduler``, otherwise all in one length-bucketed
+    call.  Returns the translations
+    in order and the distinct prompts that had to be generated.
+    """
+    entry = registry.entry(model)
+    keys = [make_cache_key(prompt, entry.path, backend=entry.backend, **generate_kwargs) for prompt in prompts]
+    translations = [cache.get(key) for key in keys]
+    missing = list(dict.fromkeys(prompt for prompt, translation in zip(prompts, translations) if translation is None))
+    results = {}
+    if missing:
+        with _generation_slot():
+            _load(entry.name, trace)
+            if use_scheduler:
+                futures = [scheduler.submit_async(prompt, model=entry.name, **generate_kwargs) for prompt in missing]
+                results = dict(zip(missing, [future.result() for future in futures]))
+            else:
+                # Possibly many prompts of uneven length: generate them in
+                # length buckets rather than one batch padded to the longest
+                results = dict(zip(missing, _translate(missing, bucketed=True, model=entry.name, **generate_kwargs)))
+        for i, (prompt, key) in enumerate(zip(prompts, keys)):
+            if translations[i] is None:
+                translations[i] = results[prompt]
+                cache.set(key, translations[i])
+    return translations, results
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     translation = None
@@ -49,42 +273,304 @@ def index():
         # Get the user-supplied cuneiform text and selected prompt key
         cuneiform_text = request.form.get("cuneiform_text", "")
         prompt_key = request.form.get("prompt")
+        document_id = request.form.get("document_id", "").strip()
+        model = registry.route(prompt_key)
+        trace = _trace("/", prompt_key)
         
-        # Choose the correct normalization function based on the prompt key
-        if prompt_key == "Translate cuneiform":
-            processed_text = normalizeString_cuneiform(
-                cuneiform_text, use_prefix=True, task="Translate", language="Akkadian"
-            )
-        elif prompt_key == "Translate transliteration":
-            processed_text = normalizeString_cuneiform_transliterate_translate(
-                cuneiform_text, use_prefix=True, task="Translate", type="origional", language="Akkadian"
-            )
-        elif prompt_key == "Translate uncertain transliteration":
-            processed_text = normalizeString_cuneiform_transliterate_translate(
-                cuneiform_text, use_prefix=True, task="Translate", type="simple", language="Akkadian"
-            )
-        elif prompt_key == "Translate English to cuneiform":
-            processed_text = normalizeString_en(
-                cuneiform_text, use_prefix=True, task="Translate", target="cuneiform", language="Akkadian"
-            )
-        elif prompt_key == "Translate English to transliteration":
-            processed_text = normalizeString_en(
-                cuneiform_text, use_prefix=True, task="Translate", target="transliteration", type="origional", language="Akkadian"
-            )
-        elif prompt_key == "Transliterate cuneiform":
-            processed_text = normalizeString_cuneiform(
-                cuneiform_text, use_prefix=True, task="Transliterate", type="origional", language="Akkadian"
-            )
+        if document_id:
+            # Line by line, generating only the lines changed since this
+            # document was last submitted
+            with trace.span("normalize"):
+                lines = _segment_lines(cuneiform_text, prompt_key)
+            with trace.span("translate"):
+                line_translations, changed = translate_document(
+                    documents, document_id, lines,
+                    lambda prompts: translate_prompts(prompts, model, use_scheduler=True, trace=trace, max_length=512, **DECODING_OPTIONS)[0],
+                )
+                translation = "\n".join(line_translations)
+            _count_lines(lines, changed)
+            fields = {"lines": len(lines), "changed_lines": len(changed)}
         else:
-            # Fallback: if no valid prompt is selected, just use a stripped version of the text
-            processed_text = trim_singles(cuneiform_text)
+            with trace.span("normalize"):
+                segments = _segment(cuneiform_text, prompt_key)
+
+            # Tokenize and generate in the scheduler's next batch, unless these
+            # exact prompts have been translated before
+            with trace.span("translate"):
+                translations, generated = translate_prompts(segments, model, use_scheduler=True, trace=trace, max_length=512, **DECODING_OPTIONS)
+                translation = join_translations(translations)
+            fields = {"segments": len(segments), "generated": len(generated)}
 
-        # Tokenize the processed text and generate the model output
-        input_ids = tokenizer.encode(processed_text, return_tensors="pt")
-        output_ids = model.generate(input_ids, max_length=512)
-        translation = tokenizer.decode(output_ids[0], skip_special_tokens=True)
+        with trace.span("render"):
+            page = render_template("index.html", translation=translation, prompt_styles=PROMPT_STYLES, document_id=document_id)
+        trace.finish(input_chars=len(cuneiform_text), **fields)
+        return page
         
     return render_template("index.html", translation=translation, prompt_styles=PROMPT_STYLES)
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route("/stream", methods=["POST"])
+def stream():
+    """
+    Same form fields as index() (including document_id), but the
+    translation is sent as server-sent events while it is generated: "token" events carrying {"text": ...}
+    pieces, then a "done" event.  If the client goes away, generation is
+    cancelled at its next decoding step.
+    """
+    cuneiform_text = request.form.get("cuneiform_text", "")
+    prompt_key = request.form.get("prompt")
+    document_id = request.form.get("document_id", "").strip()
+    entry = registry.entry(registry.route(prompt_key))
+    trace = _trace("/stream", prompt_key)
+    with trace.span("normalize"):
+        # A document is streamed line by line, its unchanged lines first
+        # taken from its previous submission; other input is one "line"
+        lines = _segment_lines(cuneiform_text, prompt_key) if document_id else [_segment(cuneiform_text, prompt_key)]
+        previous = documents.get(document_id) if document_id else None
+        reused = match_lines(previous, lines) if previous is not None else {}
+        # Cached segments are looked up once, up front, so that only a
+        # request with something left to generate needs a slot
+        cache_keys = {
+            processed_text: make_cache_key(processed_text, entry.path, backend=entry.backend, max_length=512, **DECODING_OPTIONS)
+            for i, line in enumerate(lines) if i not in reused for processed_text in line
+        }
+        cached_translations = {processed_text: cache.get(key) for processed_text, key in cache_keys.items()}
+    needs_slot = any(translation is None for translation in cached_translations.values())
+    if needs_slot:
+        # The slot is held until the response is closed, even if the stream
+        # is never read
+        try:
+            _acquire_slot()
+        except ServerBusy:
+            trace.finish(input_chars=len(cuneiform_text), error="busy")
+            raise
+
+    def events():
+        # Long inputs are streamed one segment after another, separated by
+        # a space once any text has been sent; lines are separated by "\n"
+        generated = 0
+        line_translations = []
+        try:
+            for i, line in enumerate(lines):
+                if i:
+                    yield _sse("token", {"text": "\n"})
+                if i in reused:
+                    if reused[i].strip():
+                        yield _sse("token", {"text": reused[i].strip()})
+                    line_translations.append(reused[i])
+                    continue
+                separator, segment_translations = "", []
+                for processed_text in line:
+                    cached = cached_translations[processed_text]
+                    if cached is not None:
+                        if cached.strip():
+                            yield _sse("token", {"text": separator + cached.strip()})
+                            separator = " "
+                        segment_translations.append(cached)
+                        continue
+                    cancel_event = threading.Event()
+                    pieces = []
+                    try:
+                        _load(entry.name, trace)
+                        with trace.span("generate"):
+                            for text in registry.get(entry.name).stream(processed_text, cancel_event, max_length=512, **DECODING_OPTIONS):
+                                yield _sse("token", {"text": text if pieces else separator + text.lstrip()})
+                                pieces.append(text)
+                                separator = " "
+                    except Exception as e:
+                        yield _sse("error", {"error": str(e)})
+                        return
+                    finally:
+                        # Runs on GeneratorExit too, i.e. when the client disconnects
+                        cancel_event.set()
+                    cache.set(cache_keys[processed_text], "".join(pieces))
+                    # A segment repeated later in the input is not generated twice
+                    cached_translations[processed_text] = "".join(pieces)
+                    segment_translations.append("".join(pieces))
+                    generated += 1
+                line_translations.append(join_translations(segment_translations))
+            if document_id:
+                documents.set(document_id, (tuple(lines), line_translations))
+                _count_lines(lines, [i for i, line in enumerate(lines) if line and i not in reused])
+            yield _sse("done", {"cached": generated == 0})
+        finally:
+            trace.finish(input_chars=len(cuneiform_text), segments=sum(len(line) for line in lines), generated=generated)
+
+    response = Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    if needs_slot:
+        response.call_on_close(_release_slot)
+    return response
+
+# Generation parameters the JSON API accepts, with their types
+GENERATION_PARAMETERS = {
+    "max_length": int,
+    "num_beams": int,
+    "do_sample": bool,
+    "temperature": float,
+    "top_k": int,
+    "top_p": float,
+    "repetition_penalty": float,
+    "no_repeat_ngram_size": int,
+    "length_penalty": float,
+    "length_ratio": float,
+    "length_margin": int,
+    "repetition_guard": int,
+}
+API_MAX_TEXTS = int(os.environ.get("AKK_API_MAX_TEXTS", 256))
+API_MAX_LENGTH = 512
+# Beams multiply a request's generation cost
+API_MAX_BEAMS = 8
+
+# Ranges generate() accepts, checked up front so a bad request is a 400
+GENERATION_RANGES = {
+    "num_beams": (lambda value: 1 <= value <= API_MAX_BEAMS, f"between 1 and {API_MAX_BEAMS}"),
+    "top_k": (lambda value: value >= 1, "at least 1"),
+    "temperature": (lambda value: value > 0, "positive"),
+    "top_p": (lambda value: 0 < value <= 1, "in (0, 1]"),
+    "repetition_penalty": (lambda value: value > 0, "positive"),
+    "no_repeat_ngram_size": (lambda value: value >= 0, "non-negative"),
+}
+
+def _generation_kwargs(params):
+    """
+    Validate the "generation" object of an API request.
+    """
+    if not isinstance(params, dict):
+        raise ValueError('"generation" must be an object')
+    kwargs = {"max_length": API_MAX_LENGTH, **DECODING_OPTIONS}
+    for name, value in params.items():
+        expected = GENERATION_PARAMETERS.get(name)
+        if expected is None:
+            raise ValueError(f"unsupported generation parameter {name!r}")
+        if expected is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            raise ValueError(f"generation parameter {name!r} must be {expected.__name__}")
+        kwargs[name] = value
+    if not 1 <= kwargs["max_length"] <= API_MAX_LENGTH:
+        raise ValueError(f"max_length must be between 1 and {API_MAX_LENGTH}")
+    for name in DECODING_OPTIONS:
+        if kwargs[name] < 0:
+            raise ValueError(f"{name} must not be negative")
+    for name, (valid, expected) in GENERATION_RANGES.items():
+        if name in kwargs and not valid(kwargs[name]):
+            raise ValueError(f"{name} must be {expected}")
+    return kwargs
+
+@app.route("/api/translate", methods=["POST"])
+def api_translate():
+    """
+    Translate a list of texts in one request:
+
+        {"texts": [...], "prompt": "<PROMPT_STYLES key>" or "prompts": [one key per text],
+         "generation": {"num_beams": 4, "max_length": 256, "do_sample": false, ...}}
+
+    "generation" may also override the decoding options (length_ratio,
+    length_margin, repetition_guard; see DECODING_OPTIONS).
+
+    Returns {"translations": [...]} in the order of "texts", and the model
+    that served each text (see model_registry.py) in "models".  Texts that
+    are not cached are translated together, in one call per model.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    texts = payload.get("texts")
+    if not isinstance(texts, list):
+        return jsonify({"error": '"texts" must be a list of strings'}), 400
+    for i, text in enumerate(texts):
+        if not isinstance(text, str):
+            return jsonify({"error": f'"texts"[{i}] must be a string'}), 400
+    if len(texts) > API_MAX_TEXTS:
+        return jsonify({"error": f"at most {API_MAX_TEXTS} texts per request"}), 400
+    prompt_keys = payload.get("prompts", [payload.get("prompt")] * len(texts))
+    if not isinstance(prompt_keys, list) or len(prompt_keys) != len(texts):
+        return jsonify({"error": '"prompts" must have one entry per text'}), 400
+    for i, key in enumerate(prompt_keys):
+        # Also keeps unhashable entries out of the lookups below
+        if not isinstance(key, str):
+            return jsonify({"error": f'"prompts"[{i}] must be a prompt style name', "prompt_styles": list(PROMPT_STYLES)}), 400
+    unknown = sorted({key for key in prompt_keys if key not in PROMPT_STYLES})
+    if unknown:
+        return jsonify({"error": f"unknown prompt style(s): {unknown}", "prompt_styles": list(PROMPT_STYLES)}), 400
+    try:
+        generate_kwargs = _generation_kwargs(payload.get("generation", {}))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Requests mixing prompt styles are counted under "other"
+    trace = _trace("/api/translate", prompt_keys[0] if len(set(prompt_keys)) == 1 else None)
+
+    # Long texts are split into segments; the segments of all texts are
+    # translated together and joined back per text
+    with trace.span("normalize"):
+        segmented = [_segment(text, key) for text, key in zip(texts, prompt_keys)]
+        prompts = [prompt for segments in segmented for prompt in segments]
+        # The model serving each prompt
+        models = [registry.route(key) for key, segments in zip(prompt_keys, segmented) for _ in segments]
+    with trace.span("translate"):
+        # One call per model, each translating its prompts together
+        results, generated, cached = [None] * len(prompts), 0, 0
+        for model in dict.fromkeys(models):
+            indices = [i for i, name in enumerate(models) if name == model]
+            try:
+                model_results, model_generated = translate_prompts([prompts[i] for i in indices], model, trace=trace, **generate_kwargs)
+            except ValueError as e:
+                # generate() rejecting a combination of parameters
+                trace.finish(error="ValueError")
+                return jsonify({"error": str(e)}), 400
+            for i, translation in zip(indices, model_results):
+                results[i] = translation
+            generated += len(model_generated)
+            cached += sum(1 for i in indices if prompts[i] not in model_generated)
+    translations, position = [], 0
+    for segments in segmented:
+        translations.append(join_translations(results[position:position + len(segments)]))
+        position += len(segments)
+    text_models = [registry.route(key) for key in prompt_keys]
+    trace.finish(texts=len(texts), segments=len(prompts), generated=generated, cached=cached)
+    return jsonify({
+        "translations": translations,
+        # The model's name if every text used the same one, and per text
+        "model": text_models[0] if len(set(text_models)) == 1 else None,
+        "models": text_models,
+        "cached": cached,
+    })
+
+@app.route("/ready", methods=["GET"])
+def ready():
+    # Readiness probe: 503 until the default model has been loaded
+    default = registry.entry()
+    status = {"ready": default.model.ready, "model": default.name, "backend": default.backend,
+              "models": registry.stats()["models"]}
+    return jsonify(status), 200 if default.model.ready else 503
+
+@app.route("/cache", methods=["GET"])
+def cache_stats():
+    return jsonify(dict(cache.stats(), normalizers=normalizer_cache_stats(), segments=segment_cache.stats(), documents=documents.stats()))
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    # Prometheus scrape target
+    stats = cache.stats()
+    CACHE_LOOKUPS.set_total(stats["hits"], result="hit")
+    CACHE_LOOKUPS.set_total(stats["misses"], result="miss")
+    CACHE_ENTRIES.set(stats["size"])
+    for name, model_stats in registry.stats()["models"].items():
+        MODEL_READY.set(1 if model_stats["loaded"] else 0, model=name)
+        MODEL_MEMORY.set(model_stats["memory_bytes"], model=name)
+        MODEL_LOADS.set_total(model_stats["loads"], model=name)
+        MODEL_EVICTIONS.set_total(model_stats["evictions"], model=name)
+    for name, normalizer_stats in normalizer_cache_stats().items():
+        NORMALIZER_LOOKUPS.set_total(normalizer_stats["hits"], normalizer=name, result="hit")
+        NORMALIZER_LOOKUPS.set_total(normalizer_stats["misses"], normalizer=name, result="miss")
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
+    warm_up_in_background()
     app.run(debug=True)
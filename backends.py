@@ -0,0 +1,122 @@
+"""
+Interchangeable inference backends for the translation model.
+
+Every backend loads a tokenizer and a model for ``model_name`` and exposes
+``translate(batch, stats=None, **generate_kwargs)``, returning one decoded
+string per prompt in ``batch`` (and filling ``stats``, see translate_batch),
+``translate_bucketed(batch, ...)``, the same for large batches of uneven
+length, and ``stream(prompt, cancel_event, **generate_kwargs)``, yielding the
+translation of one prompt piece by piece:
+
+    torch      the eager full-precision PyTorch model
+    quantized  the same model with its Linear layers dynamically quantized
+               to int8
+    onnx       an ONNX export of the encoder and decoders (see export_onnx.py)
+               run with onnxruntime, reusing the decoder KV cache
+
+Given a ``draft_model`` (a smaller local model with the same vocabulary),
+the PyTorch backends use it to draft tokens for assisted generation.
+
+The heavy imports (torch, transformers, optimum) happen inside the loaders.
+"""
+from translation import load_model, load_tokenizer, stream_translation, translate_batch, translate_bucketed
+
+class TorchBackend:
+    """
+    The eager PyTorch T5ForConditionalGeneration.
+    """
+    name = "torch"
+
+    def __init__(self, model_name, draft_model=None):
+        self.model_name = model_name
+        self.tokenizer, self.model = self.load(model_name)
+        self.draft_model = self.load_draft(draft_model) if draft_model else None
+
+    def load(self, model_name):
+        return load_model(model_name)
+
+    def load_draft(self, draft_model):
+        return load_model(draft_model)[1]
+
+    def _assisted(self, kwargs):
+        if self.draft_model is not None:
+            kwargs.setdefault("assistant_model", self.draft_model)
+        return kwargs
+
+    def translate(self, batch, max_length=512, stats=None, **generate_kwargs):
+        return translate_batch(self.model, self.tokenizer, batch, max_length=max_length, stats=stats, **self._assisted(generate_kwargs))
+
+    def translate_bucketed(self, batch, max_length=512, stats=None, **options):
+        return translate_bucketed(self.model, self.tokenizer, batch, max_length=max_length, stats=stats, **self._assisted(options))
+
+    def stream(self, prompt, cancel_event=None, max_length=512, **generate_kwargs):
+        return stream_translation(self.model, self.tokenizer, prompt, cancel_event, max_length=max_length, **self._assisted(generate_kwargs))
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    The PyTorch model with dynamically int8-quantized Linear layers.  Weights
+    are quantized once at load; activations are quantized on the fly.
+    """
+    name = "quantized"
+
+    def load(self, model_name):
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+        tokenizer, model = load_model(model_name)
+        model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return tokenizer, model
+
+class OnnxBackend(TorchBackend):
+    """
+    An exported ONNX encoder/decoder pair run with onnxruntime through
+    optimum's ORTModelForSeq2SeqLM, with the past key/values of the decoder
+    kept between steps (``use_cache=True``).  ``model_name`` is the directory
+    written by export_onnx.py.
+    """
+    name = "onnx"
+
+    def load(self, model_name):
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        tokenizer = load_tokenizer(model_name)
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, use_cache=True)
+        return tokenizer, model
+
+    def load_draft(self, draft_model):
+        raise ValueError("assisted generation with a draft model needs the torch or quantized backend")
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+def load_backend(model_name, backend="torch", draft_model=None):
+    """
+    Load ``model_name`` with the backend registered under ``backend``, and
+    ``draft_model`` for assisted generation if given.
+    """
+    try:
+        backend_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {sorted(BACKENDS)}")
+    return backend_class(model_name, draft_model)
+
+def compare_backends(reference, candidate, prompts, batch_size=8, **generate_kwargs):
+    """
+    Translate ``prompts`` with both backends and report how often the
+    candidate's output matches the reference exactly.
+    """
+    mismatches = []
+    for i in range(0, len(prompts), batch_size):
+        batch = prompts[i:i + batch_size]
+        expected = reference.translate(batch, **generate_kwargs)
+        actual = candidate.translate(batch, **generate_kwargs)
+        for prompt, e, a in zip(batch, expected, actual):
+            if e != a:
+                mismatches.append({"prompt": prompt, "expected": e, "actual": a})
+    return {
+        "total": len(prompts),
+        "matches": len(prompts) - len(mismatches),
+        "match_rate": (len(prompts) - len(mismatches)) / len(prompts) if prompts else 1.0,
+        "mismatches": mismatches,
+    }
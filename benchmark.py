@@ -0,0 +1,303 @@
+"""
+Offline benchmarks for the normalization pipelines and the serving path.
+
+    python benchmark.py results.json
+    python benchmark.py new.json --compare results.json
+
+Synthetic cuneiform, transliteration and English corpora of several line
+lengths are generated from a fixed seed.  The normalization functions are
+timed over them (best of --repeat runs, reported as chars/sec and
+lines/sec).  A tiny T5 with a SentencePiece vocabulary trained on the same
+corpora is then built in a temporary directory, so no download is needed,
+and generate latency and the index() request path are timed against it
+(p50/p90/p99 in milliseconds).  Results are written as JSON; --compare
+prints the ratio of every figure to an earlier run.
+"""
+import argparse, json, os, platform, random, sys, tempfile, time
+
+from normalization import (
+    clear_normalizer_caches,
+    gap_filler,
+    normalizeString_cuneiform,
+    normalizeString_cuneiform_transliterate_translate,
+    normalizeString_en,
+    normalize,
+    remove_control_characters,
+    unicodeToAscii,
+)
+
+# Words per line for each corpus length
+CORPUS_LENGTHS = {"short": 5, "medium": 40, "long": 300}
+
+SYLLABLES = ["a", "na", "be", "li2", "ia", "qi2", "bi2", "ma", "um", "sza", "ri", "ka", "szum", "wi", "lum", "ki", "du", "tu", "i", "ku"]
+DETERMINATIVES = ["{d}", "{m}", "{f}", "{ki}", "{disz}"]
+LOGOGRAMS = ["ARAD", "LUGAL", "DUMU", "E2", "KUR", "GAL"]
+GAPS = ["[...]", "x x x", "...", "x", "(break)"]
+ENGLISH = ("to my lord speak thus says your servant may the gods keep you well the king of the land "
+           "sent silver and barley to the city gate of the temple").split()
+PUNCTUATION = [",", ".", ";", "!", "?", ""]
+
+def synthetic_cuneiform(rng, words):
+    signs = [chr(0x12000 + rng.randrange(0x36F)) for _ in range(words * 2)]
+    out = []
+    for _ in range(words):
+        out.append("*" if rng.random() < 0.05 else "".join(signs.pop() for _ in range(rng.randint(1, 2))))
+    return " ".join(out)
+
+def synthetic_transliteration(rng, words):
+    out = []
+    for _ in range(words):
+        roll = rng.random()
+        if roll < 0.05:
+            out.append(rng.choice(GAPS))
+        elif roll < 0.12:
+            out.append(rng.choice(LOGOGRAMS))
+        else:
+            word = "-".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+            out.append(rng.choice(DETERMINATIVES) + word if roll < 0.2 else word)
+    return " ".join(out)
+
+def synthetic_english(rng, words):
+    return " ".join(rng.choice(ENGLISH) + rng.choice(PUNCTUATION) for _ in range(words)).capitalize()
+
+GENERATORS = {
+    "cuneiform": synthetic_cuneiform,
+    "transliteration": synthetic_transliteration,
+    "english": synthetic_english,
+}
+
+def make_corpora(lines=200, seed=0):
+    """
+    ``{(kind, length): [line, ...]}`` for every generator and length.
+    """
+    rng = random.Random(seed)
+    return {
+        (kind, length): [generate(rng, words) for _ in range(lines)]
+        for kind, generate in GENERATORS.items()
+        for length, words in CORPUS_LENGTHS.items()
+    }
+
+# (name, function, corpus kinds it is run on)
+NORMALIZATION_BENCHMARKS = [
+    ("normalizeString_cuneiform", lambda s: normalizeString_cuneiform(s, use_prefix=True, task="Translate", language="Akkadian"), ["cuneiform"]),
+    ("normalizeString_cuneiform_transliterate_translate", lambda s: normalizeString_cuneiform_transliterate_translate(s, use_prefix=True, task="Translate", type="original", language="Akkadian"), ["transliteration"]),
+    ("normalizeString_en", lambda s: normalizeString_en(s, use_prefix=True, task="Translate", target="cuneiform", language="Akkadian"), ["english"]),
+    ("gap_filler", gap_filler, ["transliteration", "english"]),
+    ("remove_control_characters", remove_control_characters, ["cuneiform", "transliteration", "english"]),
+    ("unicodeToAscii", unicodeToAscii, ["cuneiform", "transliteration", "english"]),
+    ("normalize", normalize, ["cuneiform", "transliteration", "english"]),
+]
+
+def time_function(fn, lines, repeat=5):
+    """
+    Best wall time of ``repeat`` passes of ``fn`` over ``lines``.  The
+    normalizers' line caches are cleared first, so every pass is cold.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        clear_normalizer_caches()
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_normalization(corpora, repeat=5):
+    results = []
+    for name, fn, kinds in NORMALIZATION_BENCHMARKS:
+        for (kind, length), lines in corpora.items():
+            if kind not in kinds:
+                continue
+            seconds = time_function(fn, lines, repeat)
+            chars = sum(len(line) for line in lines)
+            results.append({
+                "function": name,
+                "corpus": kind,
+                "length": length,
+                "lines": len(lines),
+                "chars": chars,
+                "seconds": seconds,
+                "chars_per_sec": chars / seconds,
+                "lines_per_sec": len(lines) / seconds,
+            })
+    return results
+
+def percentiles(samples):
+    """
+    Nearest-rank p50/p90/p99, mean and max of latencies in seconds, as ms.
+    """
+    ordered = sorted(samples)
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": rank(50),
+        "p90_ms": rank(90),
+        "p99_ms": rank(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def build_tiny_t5(output_dir, corpora, seed=0):
+    """
+    Write a randomly initialized two-layer T5 and a SentencePiece tokenizer
+    trained on ``corpora`` to ``output_dir``.
+    """
+    import sentencepiece as spm
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration, T5Tokenizer
+    from prompts import PROMPT_STYLES
+
+    text_path = os.path.join(output_dir, "corpus.txt")
+    with open(text_path, "w", encoding="utf-8") as file:
+        file.writelines(prompt + "\n" for prompt in PROMPT_STYLES.values())
+        for lines in corpora.values():
+            file.writelines(line + "\n" for line in lines)
+    spm.SentencePieceTrainer.train(
+        input=text_path, model_prefix=os.path.join(output_dir, "spm"), vocab_size=1200,
+        hard_vocab_limit=False, character_coverage=1.0,
+        pad_id=0, eos_id=1, unk_id=2, bos_id=-1, minloglevel=2,
+    )
+    tokenizer = T5Tokenizer(vocab_file=os.path.join(output_dir, "spm.model"), extra_ids=0)
+    tokenizer.save_pretrained(output_dir)
+    torch.manual_seed(seed)
+    config = T5Config(
+        vocab_size=len(tokenizer), d_model=64, d_ff=128, num_layers=2, num_heads=4, d_kv=16,
+        decoder_start_token_id=0, pad_token_id=0, eos_token_id=1,
+    )
+    T5ForConditionalGeneration(config).save_pretrained(output_dir)
+
+def benchmark_generate(model_dir, corpora, requests=50, batch_size=8, new_tokens=32):
+    """
+    Latency of translate() for single prompts and for batches, decoding a
+    fixed ``new_tokens`` steps so runs are comparable.
+    """
+    from backends import load_backend
+    from prompts import normalize_prompt
+
+    backend = load_backend(model_dir, "torch")
+    prompts = [normalize_prompt(line, "Translate transliteration") for line in corpora[("transliteration", "medium")]]
+    kwargs = {"max_length": new_tokens + 1, "min_length": new_tokens + 1}
+    backend.translate(prompts[:1], **kwargs)  # warm up
+
+    single = []
+    for prompt in prompts[:requests]:
+        start = time.perf_counter()
+        backend.translate([prompt], **kwargs)
+        single.append(time.perf_counter() - start)
+    batched = []
+    for i in range(0, min(requests * batch_size, len(prompts)) - batch_size + 1, batch_size):
+        start = time.perf_counter()
+        backend.translate(prompts[i:i + batch_size], **kwargs)
+        batched.append(time.perf_counter() - start)
+    return {
+        "new_tokens": new_tokens,
+        "single": percentiles(single),
+        "batch": dict(percentiles(batched), batch_size=batch_size),
+    }
+
+def benchmark_index(model_dir, corpora, requests=50):
+    """
+    Latency of POST / through the Flask test client, cold (cache cleared
+    before every request), for each prompt style's natural input.
+    """
+    os.environ["AKK_MODEL"] = model_dir
+    os.environ.setdefault("AKK_BACKEND", "torch")
+    import app as app_module
+
+    client = app_module.app.test_client()
+    inputs = {
+        "Translate cuneiform": corpora[("cuneiform", "medium")],
+        "Translate transliteration": corpora[("transliteration", "medium")],
+        "Translate English to transliteration": corpora[("english", "medium")],
+    }
+    results = {}
+    try:
+        for prompt_key, lines in inputs.items():
+            samples = []
+            for line in lines[:requests]:
+                app_module.cache.clear()
+                start = time.perf_counter()
+                response = client.post("/", data={"cuneiform_text": line, "prompt": prompt_key})
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"POST / returned {response.status_code} for {prompt_key!r}")
+            results[prompt_key] = percentiles(samples)
+    finally:
+        app_module.scheduler.stop()
+    return results
+
+def environment():
+    info = {"python": platform.python_version(), "platform": platform.platform(), "processor": platform.processor()}
+    for module in ("torch", "transformers"):
+        try:
+            info[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return info
+
+def _figures(results, prefix=""):
+    # Flatten nested results into {"path": number}
+    figures = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            figures.update(_figures(value, f"{prefix}{key}/"))
+    elif isinstance(results, list):
+        for row in results:
+            label = "/".join(str(row[k]) for k in ("function", "corpus", "length") if k in row)
+            figures.update(_figures({k: v for k, v in row.items() if k.endswith("_per_sec")}, f"{prefix}{label}/"))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        figures[prefix.rstrip("/")] = results
+    return figures
+
+def compare(results, baseline):
+    """
+    Print new/old for every throughput (higher is better) and latency
+    (lower is better) figure present in both runs.
+    """
+    new, old = _figures(results), _figures(baseline)
+    for path in sorted(new.keys() & old.keys()):
+        if not (path.endswith("_per_sec") or path.endswith("_ms")) or not old[path]:
+            continue
+        ratio = new[path] / old[path]
+        better = ratio > 1 if path.endswith("_per_sec") else ratio < 1
+        print(f"{ratio:7.3f}x {'+' if better else '-'} {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark normalization and translation offline.")
+    parser.add_argument("output", nargs="?", default="benchmark.json", help="JSON file to write results to")
+    parser.add_argument("--lines", type=int, default=200, help="lines per synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="passes per normalization benchmark (best is kept)")
+    parser.add_argument("--requests", type=int, default=50, help="requests per latency benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-model", action="store_true", help="only benchmark normalization")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    corpora = make_corpora(args.lines, args.seed)
+    results = {
+        "environment": environment(),
+        "settings": {"lines": args.lines, "repeat": args.repeat, "requests": args.requests, "seed": args.seed},
+        "normalization": benchmark_normalization(corpora, args.repeat),
+    }
+    if not args.skip_model:
+        with tempfile.TemporaryDirectory() as model_dir:
+            build_tiny_t5(model_dir, corpora, args.seed)
+            results["generate"] = benchmark_generate(model_dir, corpora, args.requests)
+            results["index"] = benchmark_index(model_dir, corpora, args.requests)
+
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    for row in results["normalization"]:
+        print(f"{row['function']:<52} {row['corpus']:<16} {row['length']:<7} "
+              f"{row['chars_per_sec']:>14,.0f} chars/s {row['lines_per_sec']:>12,.0f} lines/s")
+    for section in ("generate", "index"):
+        for name, stats in results.get(section, {}).items():
+            if isinstance(stats, dict):
+                print(f"{section:<9} {name:<40} p50 {stats['p50_ms']:8.2f} ms  p90 {stats['p90_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            compare(results, json.load(file))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+Compact array-backed storage for large corpora.
+
+A TextColumn keeps its texts in one contiguous UTF-8 byte buffer with an
+offsets array (text ``i`` is ``data[offsets[i]:offsets[i + 1]]``) instead of
+one Python str object per text.  A PairCorpus is a source and a target
+column of the same length.
+
+    corpus = PairCorpus.from_pairs(pairs)
+    corpus = corpus.trim(max_length1, max_length2, max_length_threshold, min_length_threshold)
+    corpus.save("corpus/")
+    corpus = PairCorpus.load("corpus/")     # memory-mapped, nothing read yet
+
+Integer indexing decodes one text; slicing with step 1 is zero-copy;
+boolean masks and index arrays gather the selected texts into a new compact
+column.  Iterating a PairCorpus yields ``(source, target)`` tuples, so it can
+be passed anywhere a list of pairs is expected (trim_pairs, convert ...).
+"""
+import os
+
+import numpy as np
+
+from normalization import normalize_truncate_column
+
+# Bytes str.split() treats as whitespace on their own: \t \n \v \f \r,
+# \x1c-\x1f and space
+_ASCII_SPACE = np.zeros(256, dtype=bool)
+_ASCII_SPACE[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+# Lead bytes of the UTF-8 encodings of the other Unicode whitespace
+# characters (U+0085, U+00A0, U+1680, U+2000-U+200A, U+2028, U+2029, U+202F,
+# U+205F, U+3000); rows containing one are counted with str.split()
+_UNICODE_SPACE_LEAD = np.zeros(256, dtype=bool)
+_UNICODE_SPACE_LEAD[[0xC2, 0xE1, 0xE2, 0xE3]] = True
+
+def _runs(indices):
+    # Split sorted indices into (start, stop) runs of consecutive values
+    if len(indices) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(indices)]))
+    return [(int(indices[a]), int(indices[b - 1]) + 1) for a, b in zip(starts, stops)]
+
+class TextColumn:
+    """
+    A sequence of texts stored as UTF-8 bytes in ``data`` (uint8) delimited
+    by ``offsets`` (int64, one more than the number of texts).
+    """
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_texts(cls, texts):
+        """
+        Build a column from an iterable of strings (None is stored as "").
+        """
+        encoded = [(text or '').encode('utf-8') for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        data, offsets = self.data, self.offsets
+        for i in range(len(self)):
+            yield data[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                # A view: same buffer, a window of the offsets
+                return TextColumn(self.data, self.offsets[start:max(start, stop) + 1])
+            return self.take(np.arange(start, stop, step))
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError("TextColumn index out of range")
+            return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+        index = np.asarray(index)
+        if index.dtype == bool:
+            return self.take(np.flatnonzero(index))
+        return self.take(index)
+
+    def take(self, indices):
+        """
+        A new compact column of the texts at ``indices``, in that order.
+        Consecutive indices are copied as one block.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        indices = np.where(indices < 0, indices + len(self), indices)
+        lengths = self.byte_lengths()[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        data = np.empty(int(offsets[-1]), dtype=np.uint8)
+        position = 0
+        for start, stop in _runs(indices):
+            block = self.data[self.offsets[start]:self.offsets[stop]]
+            data[position:position + len(block)] = block
+            position += len(block)
+        return TextColumn(data, offsets)
+
+    def byte_lengths(self):
+        return np.diff(self.offsets)
+
+    def word_counts(self):
+        """
+        ``len(text.split())`` for every text, counted over the bytes.
+        """
+        data, offsets = self.data[self.offsets[0]:self.offsets[-1]], self.offsets - self.offsets[0]
+        counts = np.zeros(len(self), dtype=np.int64)
+        if len(data) == 0:
+            return counts
+        space = _ASCII_SPACE[data]
+        # A word starts at a non-space byte that follows a space or begins a text
+        after_space = np.ones(len(data), dtype=bool)
+        after_space[1:] = space[:-1]
+        text_starts = offsets[:-1]
+        after_space[text_starts[text_starts < len(data)]] = True
+        starts = ~space & after_space
+        cumulative = np.concatenate(([0], np.cumsum(starts)))
+        counts = cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+        # Rows that may hold non-ASCII whitespace are counted exactly
+        lead = np.concatenate(([0], np.cumsum(_UNICODE_SPACE_LEAD[data])))
+        for i in np.flatnonzero(lead[offsets[1:]] - lead[offsets[:-1]]):
+            counts[i] = len(self[int(i)].split())
+        return counts
+
+    def trim(self, max_length, max_length_threshold, min_length_threshold, processes=None, chunksize=20000):
+        """
+        trim_singles over the column: non-empty texts of
+        ``min_length_threshold`` to ``max_length_threshold`` words,
+        normalized and truncated to ``max_length`` characters.
+        """
+        counts = self.word_counts()
+        keep = (self.byte_lengths() > 0) & (counts >= min_length_threshold) & (counts <= max_length_threshold)
+        return TextColumn.from_texts(normalize_truncate_column(list(self[keep]), max_length, processes, chunksize))
+
+    def save(self, prefix):
+        """
+        Write ``<prefix>.data.npy`` and ``<prefix>.offsets.npy``.
+        """
+        np.save(prefix + '.data.npy', self.data[self.offsets[0]:self.offsets[-1]])
+        np.save(prefix + '.offsets.npy', self.offsets - self.offsets[0])
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        mode = 'r' if mmap else None
+        return cls(np.load(prefix + '.data.npy', mmap_mode=mode), np.load(prefix + '.offsets.npy', mmap_mode=mode))
+
+class PairCorpus:
+    """
+    Source/target text pairs as two TextColumns of equal length.
+    """
+    def __init__(self, source, target):
+        if len(source) != len(target):
+            raise ValueError("source and target columns differ in length")
+        self.source = source
+        self.target = target
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        sources, targets = [], []
+        for source, target in pairs:
+            sources.append(source)
+            targets.append(target)
+        return cls(TextColumn.from_texts(sources), TextColumn.from_texts(targets))
+
+    def __len__(self):
+        return len(self.source)
+
+    def __iter__(self):
+        return zip(self.source, self.target)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.source[index], self.target[index]
+        return PairCorpus(self.source[index], self.target[index])
+
+    def filter_by_length(self, min_words, max_source_words, max_target_words):
+        """
+        Pairs whose texts are non-empty and have between ``min_words`` and
+        the given maximum number of words on each side.
+        """
+        n1 = self.source.word_counts()
+        n2 = self.target.word_counts()
+        keep = (
+            (self.source.byte_lengths() > 0) & (self.target.byte_lengths() > 0)
+            & (n1 >= min_words) & (n1 <= max_source_words)
+            & (n2 >= min_words) & (n2 <= max_target_words)
+        )
+        return self[keep]
+
+    def trim(self, max_length1, max_length2, max_length_threshold, min_length_threshold, processes=None, chunksize=20000):
+        """
+        trim_pairs over the corpus, returning a new compact PairCorpus.
+        """
+        kept = self.filter_by_length(min_length_threshold, max_length_threshold, max_length_threshold - 5)
+        s1 = normalize_truncate_column(list(kept.source), max_length1, processes, chunksize)
+        s2 = normalize_truncate_column(list(kept.target), max_length2, processes, chunksize)
+        return PairCorpus(TextColumn.from_texts(s1), TextColumn.from_texts(s2))
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.source.save(os.path.join(directory, 'source'))
+        self.target.save(os.path.join(directory, 'target'))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Load a corpus written by save(); with ``mmap`` the buffers are mapped
+        from disk rather than read.
+        """
+        return cls(
+            TextColumn.load(os.path.join(directory, 'source'), mmap),
+            TextColumn.load(os.path.join(directory, 'target'), mmap),
+        )
@@ -0,0 +1,75 @@
+"""
+Export the translation model to ONNX and check it against the eager model.
+
+    python export_onnx.py Thalesian/AKK_60m onnx/AKK_60m
+
+The export (encoder, decoder and decoder-with-past graphs) is written with the
+tokenizer to the output directory, which can then be served with
+AKK_BACKEND=onnx AKK_MODEL=onnx/AKK_60m.  Greedy translations of sample
+prompts from both models are compared, and the script exits non-zero if
+fewer than --min-match of them agree.  --backend quantized validates the
+int8 backend the same way without exporting anything.
+"""
+import argparse, json, sys
+
+from backends import compare_backends, load_backend
+from prompts import PROMPT_STYLES, normalize_prompt
+
+SAMPLE_TEXTS = {
+    "Translate cuneiform": ["𒀭𒌓 𒂗𒆤", "𒁹𒀀𒈾 𒈠𒈾 𒅆𒁲"],
+    "Translate transliteration": ["a-na {d}utu be-li2-ia qi2-bi2-ma", "um-ma {m}a-bi-sza-ri ARAD-ka-a-ma"],
+    "Translate uncertain transliteration": ["a-na be-li-ia qi-bi-ma", "szum-ma a-wi-lum"],
+    "Translate English to cuneiform": ["to my lord speak", "the king of the land"],
+    "Translate English to transliteration": ["to my lord speak", "the king of the land"],
+    "Transliterate cuneiform": ["𒀭𒌓 𒂗𒆤", "𒁹𒀀𒈾 𒈠𒈾 𒅆𒁲"],
+}
+
+def sample_prompts(path=None):
+    """
+    Normalized prompts to validate with: one per line of ``path`` (for every
+    prompt style), or the built-in samples.
+    """
+    if path:
+        with open(path, 'r', encoding='utf-8') as file:
+            texts = [line.strip() for line in file if line.strip()]
+        return [normalize_prompt(text, key) for key in PROMPT_STYLES for text in texts]
+    return [normalize_prompt(text, key) for key, texts in SAMPLE_TEXTS.items() for text in texts]
+
+def export(model_name, output_dir):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from translation import load_tokenizer
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, use_cache=True)
+    model.save_pretrained(output_dir)
+    # Saves tokenizer.json too when fast, so the backend need not convert it
+    load_tokenizer(model_name).save_pretrained(output_dir)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export to ONNX and validate against the eager model.")
+    parser.add_argument("model", help="model name or local path of the eager model")
+    parser.add_argument("output", nargs="?", help="directory for the ONNX export")
+    parser.add_argument("--backend", default="onnx", choices=["onnx", "quantized"],
+                        help="backend to validate (quantized needs no export)")
+    parser.add_argument("--skip-export", action="store_true", help="validate an existing export")
+    parser.add_argument("--texts", help="file of sample texts to validate with, one per line")
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--min-match", type=float, default=1.0,
+                        help="minimum fraction of outputs that must match the eager model")
+    args = parser.parse_args(argv)
+
+    if args.backend == "onnx":
+        if not args.output:
+            parser.error("the ONNX backend needs an output directory")
+        if not args.skip_export:
+            export(args.model, args.output)
+        candidate = load_backend(args.output, "onnx")
+    else:
+        candidate = load_backend(args.model, "quantized")
+    reference = load_backend(args.model, "torch")
+
+    report = compare_backends(reference, candidate, sample_prompts(args.texts), max_length=args.max_length)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if report["match_rate"] < args.min_match:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Incremental re-translation of documents that are edited and resubmitted.
+
+A document is translated line by line: each line becomes a tuple of
+normalized prompts (one per segment, see segmentation.py; empty for blank
+lines).  The lines and their translations are kept under the document's ID
+in a store, a translation_cache.TranslationCache holding ``(lines,
+translations)`` pairs.  When the document comes back, its lines are aligned
+with the stored version by difflib, and only the lines that changed are
+generated again:
+
+    store = TranslationCache(maxsize=1024)
+    translations, changed = translate_document(store, "tablet-17", lines, translate)
+"""
+import difflib
+
+from segmentation import join_translations
+
+def split_lines(text):
+    # Browsers submit textareas with "\r\n" line ends
+    return text.splitlines()
+
+def match_lines(previous, lines):
+    """
+    ``{line index: translation}`` for the ``lines`` whose translation can
+    be taken from ``previous`` (the stored ``(lines, translations)``): the
+    lines difflib aligns as unchanged, and changed or moved lines identical
+    to some previous line.
+    """
+    old_lines, old_translations = previous
+    reused = {}
+    matcher = difflib.SequenceMatcher(None, old_lines, lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                reused[j1 + offset] = old_translations[i1 + offset]
+    by_line = dict(zip(old_lines, old_translations))
+    for i, line in enumerate(lines):
+        if i not in reused and line in by_line:
+            reused[i] = by_line[line]
+    return reused
+
+def translate_document(store, document_id, lines, translate):
+    """
+    Translate a document given as ``lines`` (one tuple of normalized
+    prompts per line), generating only the lines not found in its stored
+    version.  ``translate(prompts)`` returns one translation per prompt.
+    Stores the new version and returns the translation of every line and
+    the indices of the lines that were translated.
+    """
+    previous = store.get(document_id)
+    reused = match_lines(previous, lines) if previous is not None else {}
+    changed = [i for i, line in enumerate(lines) if i not in reused and line]
+    prompts = [prompt for i in changed for prompt in lines[i]]
+    results = translate(prompts) if prompts else []
+    translations = [reused.get(i, "") for i in range(len(lines))]
+    position = 0
+    for i in changed:
+        translations[i] = join_translations(results[position:position + len(lines[i])])
+        position += len(lines[i])
+    store.set(document_id, (tuple(lines), translations))
+    return translations, changed
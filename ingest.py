@@ -0,0 +1,183 @@
+"""
+Read many corpus sources concurrently.
+
+    for source, line_number, line in iter_sources(["corpus/*.txt", "https://example.org/a.txt"]):
+        ...
+
+Sources are local paths, glob patterns or http(s) URLs.  Up to
+``concurrency`` of them are read at once; URLs share one pooled requests
+session and their bodies are streamed rather than buffered.  Every line gets
+the processing of read_and_process_file (the text is stripped, split on
+"\\n", and ". . ." becomes "*"), and is yielded tagged with its source and
+its line number within it.  Lines of one source arrive in order; lines of
+different sources are interleaved.
+"""
+import glob, logging, os, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from normalization import DOTS_GAP_PATTERN
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+def is_url(source):
+    return source.startswith('http://') or source.startswith('https://')
+
+def expand_sources(sources):
+    """
+    Expand glob patterns (sorted, ``**`` allowed) and pass paths and URLs
+    through, dropping duplicates.
+    """
+    expanded = []
+    for source in sources:
+        if not is_url(source) and any(c in source for c in '*?['):
+            matches = sorted(glob.glob(source, recursive=True))
+            if not matches:
+                logger.warning("no files match %s", source)
+            expanded.extend(path for path in matches if os.path.isfile(path))
+        else:
+            expanded.append(source)
+    return list(dict.fromkeys(expanded))
+
+def make_session(pool_size=8, retries=3):
+    """
+    A requests session keeping up to ``pool_size`` connections per host
+    open, retrying failed connections and 5xx responses with backoff.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(total=retries, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504)),
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _split_lines(chunks):
+    # Split a stream of text chunks on "\n" only, as str.split('\n') would
+    pending = ''
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split('\n')
+        yield from lines
+    yield pending
+
+def _strip_text(lines):
+    # The lines of text.strip(), without holding the whole text: leading
+    # blank lines are dropped, and blank lines are held back until more text
+    # follows them
+    previous = None
+    held = []
+    for line in lines:
+        if previous is None:
+            line = line.lstrip()
+            if line:
+                previous = line
+        elif line.strip():
+            yield previous
+            yield from held
+            previous, held = line, []
+        else:
+            held.append(line)
+    # ''.split('\n') is [''], so blank text is still one (empty) line
+    yield previous.rstrip() if previous is not None else ''
+
+def _read_url(session, url, timeout):
+    with session.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        if 'charset' not in response.headers.get('content-type', '').lower():
+            response.encoding = 'utf-8'
+        yield from _split_lines(response.iter_content(CHUNK_SIZE, decode_unicode=True))
+
+def _read_file(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        yield from _split_lines(iter(lambda: file.read(CHUNK_SIZE), ''))
+
+def iter_source_lines(source, session=None, timeout=30):
+    """
+    The processed lines of a single path or URL, streamed.
+    """
+    if is_url(source):
+        own_session = session is None
+        session = session or make_session(1)
+        try:
+            raw = _read_url(session, source, timeout)
+            for line in _strip_text(raw):
+                yield DOTS_GAP_PATTERN.sub('*', line)
+        finally:
+            if own_session:
+                session.close()
+    else:
+        for line in _strip_text(_read_file(source)):
+            yield DOTS_GAP_PATTERN.sub('*', line)
+
+_DONE = object()
+
+def iter_sources(sources, concurrency=8, session=None, timeout=30, errors="raise", buffer_lines=10000):
+    """
+    Yield ``(source, line_number, line)`` for every line of ``sources``
+    (paths, globs and URLs), reading up to ``concurrency`` of them at once.
+
+    A source that fails raises its error here when ``errors`` is "raise"
+    (the remaining reads are stopped), or is logged and skipped with
+    "skip" (keeping the lines already read from it).  At most ``buffer_lines`` lines wait to be consumed, so slow
+    consumers do not make the readers buffer whole corpora.
+    """
+    if errors not in ("raise", "skip"):
+        raise ValueError('errors must be "raise" or "skip"')
+    sources = expand_sources(sources)
+    if not sources:
+        return
+    own_session = session is None and any(is_url(source) for source in sources)
+    if own_session:
+        session = make_session(concurrency)
+    lines = queue.Queue(maxsize=buffer_lines)
+    stop = threading.Event()
+
+    def put(item):
+        # Give up if the consumer has gone away
+        while not stop.is_set():
+            try:
+                lines.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read(source):
+        try:
+            for line_number, line in enumerate(iter_source_lines(source, session, timeout)):
+                if not put((source, line_number, line)):
+                    return
+        except Exception as e:
+            if errors == "raise":
+                put((source, None, e))
+            else:
+                logger.warning("skipping %s: %s", source, e)
+        finally:
+            put((source, None, _DONE))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(sources))), thread_name_prefix="ingest")
+    try:
+        for source in sources:
+            executor.submit(read, source)
+        remaining = len(sources)
+        while remaining:
+            source, line_number, line = lines.get()
+            if line is _DONE:
+                remaining -= 1
+            elif line_number is None:
+                raise line
+            else:
+                yield source, line_number, line
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_session:
+            session.close()
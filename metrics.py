@@ -0,0 +1,169 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters and histograms are kept per label set in a MetricsRegistry and
+rendered by ``registry.render()`` (served by app.py at /metrics).
+RequestTrace times the stages of one request and records them in a
+histogram when the request finishes, optionally writing one JSON log line.
+"""
+import bisect, contextlib, json, logging, math, threading, time
+
+# Seconds; covers sub-millisecond normalization up to long generations
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    A monotonically increasing count per label set.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """
+        Mirror a total kept elsewhere (e.g. a cache's hits since start).
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+class Gauge(Counter):
+    """
+    A value that is set rather than accumulated.
+    """
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    """
+    Observations counted into cumulative ``buckets`` per label set, with
+    their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), counts):
+                    cumulative += count
+                    samples.append((self.name + "_bucket", key, (("le", _format_value(bound)),), cumulative))
+                samples.append((self.name + "_sum", key, (), total))
+                samples.append((self.name + "_count", key, (), cumulative))
+        return samples
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text format (version 0.0.4).
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, extra, value in metric.samples():
+                lines.append(f"{name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class RequestTrace:
+    """
+    Stage timings of one request.  Time a stage with ``with trace.span(name)``
+    (repeated spans of a stage add up); ``finish()`` observes every stage and
+    the total in ``histogram`` (labelled route/prompt_style/stage) and, if a
+    ``logger`` is given, logs them as one JSON object with any extra fields.
+    """
+    def __init__(self, route, prompt_style, histogram, logger=None):
+        self.route = route
+        self.prompt_style = prompt_style
+        self.histogram = histogram
+        self.logger = logger
+        self.timings = {}
+        self.fields = {}
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
+
+    def finish(self, **fields):
+        self.timings["total"] = time.perf_counter() - self._start
+        for stage, seconds in self.timings.items():
+            self.histogram.observe(seconds, route=self.route, prompt_style=self.prompt_style, stage=stage)
+        if self.logger is not None and self.logger.isEnabledFor(logging.INFO):
+            self.fields.update(fields)
+            self.logger.info(json.dumps({
+                "route": self.route,
+                "prompt_style": self.prompt_style,
+                "seconds": {stage: round(seconds, 6) for stage, seconds in self.timings.items()},
+                **self.fields,
+            }, ensure_ascii=False, default=str))
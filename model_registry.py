@@ -0,0 +1,266 @@
+"""
+Several translation models served side by side.
+
+A JSON configuration names local model directories, how to run each and
+which prompt styles each serves:
+
+    {
+      "models": {
+        "akk-60m":   {"path": "models/AKK_60m"},
+        "akk-large": {"path": "models/AKK_large", "backend": "quantized", "draft_model": "models/AKK_60m"},
+        "sux-60m":   {"path": "models/SUX_60m", "language": "Sumerian", "memory_mb": 300}
+      },
+      "routes": {"Translate cuneiform": "akk-large", "Transliterate cuneiform": "sux-60m"},
+      "default": "akk-60m",
+      "memory_budget_mb": 4000
+    }
+
+    registry = ModelRegistry.from_config("models.json")
+    backend = registry.get(registry.route("Translate cuneiform"))
+
+Models load on first use (see backends.load_backend for "backend" and
+"draft_model").  A model's prompts name its "language" in their task
+prefix.  Prompt styles without a route go to the default model.
+
+Loaded models are kept in least recently used order.  Before a model is
+loaded, the least recently used ones are unloaded until its memory and that
+of the models still loaded fit in the budget.  A model's memory is its
+"memory_mb", or else the size of its weight files (and its draft model's).
+The budget is soft: a request still running on an unloaded model keeps it
+in memory until it finishes, a model is not unloaded while it is being
+loaded, and a single model larger than the budget is loaded anyway.
+"""
+import gc, json, logging, os, threading, time
+from collections import OrderedDict
+
+from backends import load_backend
+from translation import LazyModel, load_tokenizer, set_prompt_languages
+
+logger = logging.getLogger(__name__)
+
+# from_pretrained is not thread-safe (concurrent loads can leave weights on
+# the meta device), so models are loaded one at a time
+_load_lock = threading.Lock()
+
+WEIGHT_EXTENSIONS = ('.safetensors', '.bin', '.pt', '.pth', '.onnx', '.onnx_data')
+
+def weight_bytes(path):
+    """
+    Total size of the weight files in the model directory ``path`` (0 if
+    it is not a local directory, e.g. a hub name).
+    """
+    if not path or not os.path.isdir(path):
+        return 0
+    total = 0
+    for name in os.listdir(path):
+        if name.endswith(WEIGHT_EXTENSIONS):
+            total += os.path.getsize(os.path.join(path, name))
+    return total
+
+class ModelEntry:
+    """
+    One configured model: ``name`` in the registry, its directory ``path``,
+    ``backend``, optional ``draft_model``, ``language`` and estimated
+    ``memory`` in bytes.
+    """
+    def __init__(self, name, path, backend="torch", draft_model=None, language="Akkadian", memory=None, loader=load_backend):
+        self.name = name
+        self.path = path
+        self.backend = backend
+        self.draft_model = draft_model
+        self.language = language
+        self.memory = memory if memory is not None else weight_bytes(path) + weight_bytes(draft_model)
+        self.loads = 0
+        self.evictions = 0
+        self.last_used = None
+        # Callers of ModelRegistry.get loading it (guarded by the registry lock)
+        self.loading = 0
+        # Languages whose task prefixes its tokenizer reuses (see translation.PromptEncoder)
+        self.prompt_languages = (language,)
+        self._loader = loader
+        self.model = LazyModel(path, loader=self._load)
+        self._tokenizer = None
+        self._tokenizer_lock = threading.Lock()
+
+    def _load(self, path):
+        with _load_lock:
+            start = time.perf_counter()
+            backend = self._loader(path, backend=self.backend, draft_model=self.draft_model)
+        set_prompt_languages(backend.tokenizer, self.prompt_languages)
+        self.loads += 1
+        logger.info("loaded model %s from %s in %.1fs", self.name, path, time.perf_counter() - start)
+        return backend
+
+    @property
+    def tokenizer(self):
+        """
+        The model's tokenizer, loaded on its own and kept, so that inputs
+        can be measured without loading (or evicting) any model.
+        """
+        if self._tokenizer is None:
+            with self._tokenizer_lock:
+                if self._tokenizer is None:
+                    self._tokenizer = load_tokenizer(self.path)
+        return self._tokenizer
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "backend": self.backend,
+            "language": self.language,
+            "loaded": self.model.ready,
+            "memory_bytes": self.memory,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "last_used": self.last_used,
+        }
+
+class ModelRegistry:
+    """
+    Models by name, loaded on first use and unloaded least recently used
+    first to stay within ``memory_budget`` bytes (``None``: no limit).
+    ``routes`` maps prompt styles to model names; other styles go to
+    ``default`` (the first model if not given).  Thread-safe.
+    """
+    def __init__(self, entries, routes=None, default=None, memory_budget=None):
+        if not entries:
+            raise ValueError("no models configured")
+        self.models = {entry.name: entry for entry in entries}
+        self.routes = dict(routes or {})
+        self.default = default or entries[0].name
+        unknown = sorted({self.default, *self.routes.values()} - self.models.keys())
+        if unknown:
+            raise ValueError(f"routes name unknown model(s) {unknown}; configured: {sorted(self.models)}")
+        # Every configured language, so prompts are recognized whichever
+        # model they are sent to
+        self.languages = tuple(sorted({entry.language for entry in entries}))
+        for entry in entries:
+            entry.prompt_languages = self.languages
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        # Names of the models counted as loaded, least recently used first
+        self._resident = OrderedDict()
+
+    @classmethod
+    def single(cls, path, backend="torch", draft_model=None):
+        """
+        A registry of the one model ``path``, serving every prompt style.
+        """
+        return cls([ModelEntry(path, path, backend, draft_model)])
+
+    @classmethod
+    def from_config(cls, config_path):
+        """
+        A registry from a JSON configuration (see the module docstring);
+        relative model paths are taken from the configuration's directory.
+        """
+        with open(config_path, 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        base = os.path.dirname(os.path.abspath(config_path))
+
+        def resolve(path):
+            return os.path.join(base, path) if path and os.path.exists(os.path.join(base, path)) else path
+
+        entries = []
+        for name, spec in config.get("models", {}).items():
+            if "path" not in spec:
+                raise ValueError(f"model {name!r} has no path")
+            memory = int(spec["memory_mb"] * 2**20) if "memory_mb" in spec else None
+            entries.append(ModelEntry(
+                name, resolve(spec["path"]), spec.get("backend", "torch"), resolve(spec.get("draft_model")),
+                spec.get("language", "Akkadian"), memory,
+            ))
+        budget = config.get("memory_budget_mb")
+        return cls(entries, config.get("routes"), config.get("default"), int(budget * 2**20) if budget else None)
+
+    def route(self, prompt_key):
+        """
+        The name of the model serving ``prompt_key``.
+        """
+        return self.routes.get(prompt_key, self.default)
+
+    def entry(self, name=None):
+        return self.models[name or self.default]
+
+    def ready(self, name=None):
+        return self.entry(name).model.ready
+
+    def get(self, name=None):
+        """
+        The loaded backend of model ``name`` (default: the default model),
+        loading it first, and unloading others to make room, if needed.
+        """
+        entry = self.entry(name)
+        with self._lock:
+            entry.last_used = time.time()
+            if entry.name in self._resident:
+                self._resident.move_to_end(entry.name)
+            else:
+                self._resident[entry.name] = True
+            # A model is never evicted while it is being loaded
+            entry.loading += 1
+            victims = self._make_room(entry)
+        try:
+            self._unload(victims)
+            # Loads (once) outside the registry lock, so other models stay usable
+            return entry.model.load()
+        finally:
+            with self._lock:
+                entry.loading -= 1
+
+    def _resident_memory(self):
+        return sum(self.models[name].memory for name in self._resident)
+
+    def _make_room(self, entry):
+        """
+        Take the least recently used models that are not being loaded off
+        the resident list until ``entry`` (already on it) fits in the
+        budget, and return them to be unloaded once the lock is released.
+        """
+        victims = []
+        if self.memory_budget is None:
+            return victims
+        for name in list(self._resident):
+            if self._resident_memory() <= self.memory_budget:
+                break
+            victim = self.models[name]
+            if victim is entry or victim.loading:
+                continue
+            del self._resident[name]
+            victim.evictions += 1
+            victims.append(victim)
+        if entry.memory > self.memory_budget:
+            logger.warning("model %s (%d MB) exceeds the memory budget (%d MB)",
+                           entry.name, entry.memory >> 20, self.memory_budget >> 20)
+        return victims
+
+    def _unload(self, victims):
+        # Outside the registry lock: LazyModel.unload waits for a load of the
+        # same model in progress
+        for victim in victims:
+            logger.info("unloading model %s", victim.name)
+            victim.model.unload()
+        if victims:
+            gc.collect()
+
+    def unload(self, name):
+        """
+        Unload model ``name``; it is loaded again when next used.
+        """
+        entry = self.models[name]
+        with self._lock:
+            if self._resident.pop(name, None) is not None:
+                entry.evictions += 1
+        self._unload([entry])
+
+    def stats(self):
+        with self._lock:
+            resident = list(self._resident)
+            return {
+                "default": self.default,
+                "routes": dict(self.routes),
+                "memory_budget_bytes": self.memory_budget,
+                "resident_bytes": self._resident_memory(),
+                "resident": resident,
+                "models": {name: entry.stats() for name, entry in self.models.items()},
+            }
@@ -1,13 +1,47 @@
-import re, sys, os, random, glob, typing, numpy, gc, re, requests, unicodedata,  logging, csv
-import pandas as pd
+# Only lightweight standard-library imports at module level, so that the
+# normalizers import quickly; requests and pandas are imported where used.
+import functools, re, threading, unicodedata
+from collections import OrderedDict
+
+class CodepointTable(dict):
+    """
+    A str.translate table that keeps or deletes each character according
+    to ``keep(character)``: a kept codepoint maps to itself, a deleted one
+    to None.  Codepoints below ``prefill`` (Latin, Greek, Cyrillic, the
+    other alphabets and the general punctuation block) are decided when
+    the table is built; others are decided on first use and remembered
+    while the table holds fewer than ``maxsize`` entries.
+    """
+    def __init__(self, keep, prefill=0x3000, maxsize=1 << 16):
+        super().__init__()
+        self.keep = keep
+        self.maxsize = maxsize
+        for codepoint in range(prefill):
+            self.__missing__(codepoint)
+
+    def __missing__(self, codepoint):
+        value = codepoint if self.keep(chr(codepoint)) else None
+        if len(self) < self.maxsize:
+            self[codepoint] = value
+        return value
+
+# Combining marks (category Mn), which NFD splits off accented letters
+COMBINING_MARKS = CodepointTable(lambda c: unicodedata.category(c) != 'Mn')
+# Control, format, surrogate, private-use and unassigned characters (C*)
+CONTROL_CHARACTERS = CodepointTable(lambda c: unicodedata.category(c)[0] != 'C')
 
 # Turn a Unicode string to plain ASCII, thanks to
 # https://stackoverflow.com/a/518232/2809427
 def unicodeToAscii(s):
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', s)
-        if unicodedata.category(c) != 'Mn'
-    )
+    if s.isascii():
+        # NFD leaves ASCII alone and it has no combining marks
+        return s
+    return unicodedata.normalize('NFD', s).translate(COMBINING_MARKS)
+
+DOC_REF_PATTERN = re.compile(r'\bp\d+\b|\b\d{6,}\b')
+MULTI_SPACE_PATTERN = re.compile(r'\s{2,}')
+# Equivalent to r'\s+' -> ' ', but leaves the (common) single spaces alone
+WHITESPACE_PATTERN = re.compile(r'\s{2,}|[^\S ]')
 
 def remove_doc_refs(text: str) -> str:
     """
@@ -15,12 +49,10 @@ def remove_doc_refs(text: str) -> str:
     2) Remove any standalone runs of 6 or more digits (e.g. '014209')
     3) Collapse leftover whitespace
     """
-    # 1) strip p<digits>
-    cleaned = re.sub(r'\bp\d+\b', '', text)
-    # 2) strip bare doc-IDs (6+ digits)
-    cleaned = re.sub(r'\b\d{6,}\b', '', cleaned)
+    # 1) + 2) strip p<digits> and bare doc-IDs (6+ digits) in one pass
+    cleaned = DOC_REF_PATTERN.sub('', text)
     # 3) collapse spaces
-    return re.sub(r'\s{2,}', ' ', cleaned).strip()
+    return MULTI_SPACE_PATTERN.sub(' ', cleaned).strip()
 
 REMOVE_BRACKETS_TRANS = str.maketrans({
     '(': ' ',
@@ -73,31 +105,46 @@ def remove_brackets(s: str) -> str:
     """
     return s.translate(REMOVE_BRACKETS_TRANS)
 
+# Subscript digits (U+2080 to U+2089) and superscript digits to plain ASCII.
+NORMALIZE_DIGITS_TRANS = str.maketrans({
+    **{chr(0x2080 + i): str(i) for i in range(10)},
+    '⁰': '0',
+    '¹': '1',
+    '²': '2',
+    '³': '3',
+    '⁴': '4',
+    '⁵': '5',
+    '⁶': '6',
+    '⁷': '7',
+    '⁸': '8',
+    '⁹': '9',
+})
+
+# remove_brackets followed by normalize_digits as a single table; the two
+# tables touch disjoint characters so applying them together is equivalent.
+REMOVE_BRACKETS_DIGITS_TRANS = {**REMOVE_BRACKETS_TRANS, **NORMALIZE_DIGITS_TRANS}
+
 def normalize_digits(s: str) -> str:
     """
     Replace any subscript or superscript digits in the input string with their 
     regular ASCII equivalents. This will convert things like "SI₂₂" or "SI²²" 
     to "SI22".
     """
-    # Automatically generate mapping for subscript digits (U+2080 to U+2089).
-    subscript_map = {ord(chr(0x2080 + i)): str(i) for i in range(10)}
-    # Manually specify the mapping for superscript digits.
-    superscript_map = {
-        ord('⁰'): '0',
-        ord('¹'): '1',
-        ord('²'): '2',
-        ord('³'): '3',
-        ord('⁴'): '4',
-        ord('⁵'): '5',
-        ord('⁶'): '6',
-        ord('⁷'): '7',
-        ord('⁸'): '8',
-        ord('⁹'): '9',
-    }
-    # Combine both mappings into one translation table.
-    translation_map = {**subscript_map, **superscript_map}
-    # Translate the string.
-    return s.translate(translation_map)
+    return s.translate(NORMALIZE_DIGITS_TRANS)
+
+NORMALIZE_BRACKETS_TRANS = {
+    # Parentheses
+    ord('('): '{', ord(')'): '}',
+    # Square brackets
+    ord('['): '{', ord(']'): '}',
+    # Curly brackets (they might already be the desired ones, but we enforce them)
+    ord('{'): '{', ord('}'): '}',
+    # Alternative bracket types
+    ord('⸢'): '{', ord('⸣'): '}',
+    ord('<'): '{', ord('>'): '}',
+    ord('«'): '{', ord('»'): '}',
+    ord('⌞'): '{', ord('⌟'): '}',
+}
 
 def normalize_brackets(s: str) -> str:
     """
@@ -111,53 +158,48 @@ def normalize_brackets(s: str) -> str:
         normalize_brackets("2(u) 5(disz) i3 ak unu{ki}")
         # returns: "2{u} 5{disz} i3 ak unu{ki}"
     """
-    mapping = {
-        # Parentheses
-        ord('('): '{', ord(')'): '}',
-        # Square brackets
-        ord('['): '{', ord(']'): '}',
-        # Curly brackets (they might already be the desired ones, but we enforce them)
-        ord('{'): '{', ord('}'): '}',
-        # Alternative bracket types
-        ord('⸢'): '{', ord('⸣'): '}',
-        ord('<'): '{', ord('>'): '}',
-        ord('«'): '{', ord('»'): '}',
-        ord('⌞'): '{', ord('⌟'): '}',
-    }
-    return s.translate(mapping)
+    return s.translate(NORMALIZE_BRACKETS_TRANS)
+
+# A single pass equivalent to the chain of str.replace calls gap_filler used
+# to make, which replaced (in this order) '*' -> ' * ', then '[...]', '[ ]',
+# 'vac.', 'vac', 'vacat', 'fragmentum', 'infmut', 'gup', 'qs', 'vest.',
+# 'vest', 'vestigia', '...', '…', '. . .', 'xxx', 'x x x' -> '*', then
+# ' x ', 'x ', ' x' -> ' * ', then '($blank space$)', '$blank space$',
+# 'blank space' -> '*'.  Alternatives are grouped by their first character so
+# the regex engine can skip ahead, and:
+#  - 'vacat' and 'vestigia' are dropped, 'vac' / 'vest' always consumed them;
+#  - '. . .' and 'x x x' must not steal the start of a '...' / 'xxx' run,
+#    which the chain replaced before them;
+#  - a lone 'x' next to a space (or a '*', which is about to be padded) is what
+#    ' x ', 'x ' and ' x' amount to once whitespace is collapsed.
+GAP_FILLER_PATTERN = re.compile(r"""
+    \*
+  | \[ (?: \.\.\.\] | \ \] )
+  | v (?: ac\.? | est\.? )
+  | fragmentum | infmut | gup | qs | …
+  | \. (?: \.\. | \ \.\ \.(?!\.\.) )
+  | x (?: xx | \ x\ x(?!xx) | (?=[ *]) | (?<=[ *]x) )
+  | \(\$blank\ space\$\) | \$blank\ space\$ | blank\ space
+""", re.VERBOSE)
+
+def _gap_replacement(match):
+    return ' * ' if match.group() in ('*', 'x') else '*'
 
 def gap_filler(s, source="cuneiform"):
     if source=="cuneiform":
-        s = s.replace('*', ' * ')
-        s = s.replace('[...]', '*')
-        s = s.replace('[ ]', '*')
-        s = s.replace('vac.', '*')
-        s = s.replace('vac', '*')
-        s = s.replace('vacat', '*')
-        s = s.replace('fragmentum', '*')
-        s = s.replace('fragmentum', '*')
-        s = s.replace('infmut', '*')
-        s = s.replace('gup', '*')
-        s = s.replace('qs', '*')
-        s = s.replace('vest.', '*')
-        s = s.replace('vest', '*')
-        s = s.replace('vestigia', '*')
-        s = s.replace('...', '*')
-        s = s.replace('…', '*')
-        s = s.replace('. . .', '*')
-        s = s.replace('xxx', '*')
-        s = s.replace('x x x', '*')
-        s = s.replace(' x ', ' * ')
-        s = s.replace('x ', ' * ')
-        s = s.replace(' x', ' * ')
-        s = s.replace('($blank space$)', '*')
-        s = s.replace('$blank space$', '*')
-        s = s.replace('blank space', '*')
+        s = GAP_FILLER_PATTERN.sub(_gap_replacement, s)
         #s = re.sub(r'x+', '<cuneiform_gap>', s)
         #s = remove_brackets(s)
-        s = re.sub(r'\s+', ' ', s).strip()
+        s = WHITESPACE_PATTERN.sub(' ', s).strip()
     return s
 
+CUNEIFORM_GAP_PATTERN = re.compile(
+    r'(?:<\s*c\s*u\s*n\s*e\s*i\s*f\s*o\s*r\s*m\s*_\s*g\s*a\s*p\s*>)'  # spaced-out <cuneiform_gap> with underscore
+    r'|(?:c\s*u\s*n\s*e\s*i\s*f\s*o\s*r\s*m\s+gap)'                  # spaced-out c u n e i f o r m gap
+    r'|(?:cuneiform\s+gap)',                                        # plain "cuneiform gap"
+    flags=re.IGNORECASE
+)
+
 def fix_cuneiform_gap(s: str) -> str:
     """
     Replaces any spaced-out version of:
@@ -168,23 +210,201 @@ def fix_cuneiform_gap(s: str) -> str:
       cuneiform gap
     with <cuneiform_gap>.
     """
-    pattern = re.compile(
-        r'(?:<\s*c\s*u\s*n\s*e\s*i\s*f\s*o\s*r\s*m\s*_\s*g\s*a\s*p\s*>)'  # spaced-out <cuneiform_gap> with underscore
-        r'|(?:c\s*u\s*n\s*e\s*i\s*f\s*o\s*r\s*m\s+gap)'                  # spaced-out c u n e i f o r m gap
-        r'|(?:cuneiform\s+gap)',                                        # plain "cuneiform gap"
-        flags=re.IGNORECASE
-    )
-    return pattern.sub("<cuneiform_gap>", s)
+    return CUNEIFORM_GAP_PATTERN.sub("<cuneiform_gap>", s)
+
+# This pattern means:
+#  - 's' followed by 1+ non-word characters (spaces, etc.)
+#  - 'u' followed by 1+ non-word chars
+#  - 'p' ...
+#  - and so on until 'm'
+SUPRASIGILLUM_PATTERN = re.compile(r"s\W+u\W+p\W+r\W+a\W+s\W+i\W+g\W+i\W+l\W+l\W+u\W+m")
+
+def fix_suprasigillum(text):
+    return SUPRASIGILLUM_PATTERN.sub("suprasigillum", text)
+
+# Everything that is not a Latin letter or a gap marker.  After remove_brackets
+# there is no '.', '!' or '?' left, so the original "([.!?]) -> ' \1'" and
+# "[^a-zA-Z!?*]+ -> ' '" substitutions reduce to this single one.
+NON_LETTER_PATTERN = re.compile(r'[^a-zA-Z*]+')
+
+# The same two substitutions for normalizeString_en, where '!' and '?' are
+# still present: any run of other characters becomes a space, and a '!' or '?'
+# that does not already follow such a run gets a space in front of it.
+EN_SEPARATOR_PATTERN = re.compile(r'[^a-zA-Z!?*]+|(?<![^a-zA-Z!?*])(?=[!?])')
+
+class Normalizer:
+    """
+    A normalization pipeline compiled once at import time.
+
+    Each step is a plain ``str -> str`` callable (a bound translate table, a
+    precompiled pattern's ``sub`` ...), applied in order.
+    """
+    def __init__(self, *steps):
+        self.steps = steps
+
+    def __call__(self, s):
+        for step in self.steps:
+            s = step(s)
+        return s
+
+class MemoizedNormalizer:
+    """
+    A normalizer whose results are kept in a bounded LRU cache keyed on the
+    input line, so repeated lines are normalized once.  The cache holds at
+    most ``maxsize`` lines and ``max_total_chars`` characters (inputs and
+    results); lines longer than ``max_chars`` are normalized without being
+    cached.  Thread-safe.
+    """
+    def __init__(self, normalizer, maxsize=65536, max_chars=512, max_total_chars=4_000_000):
+        self.normalizer = normalizer
+        self.maxsize = maxsize
+        self.max_chars = max_chars
+        self.max_total_chars = max_total_chars
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._chars = 0
+
+    def __call__(self, s):
+        if len(s) > self.max_chars:
+            return self.normalizer(s)
+        with self._lock:
+            result = self._entries.get(s)
+            if result is not None:
+                self._entries.move_to_end(s)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = self.normalizer(s)
+        with self._lock:
+            if s not in self._entries:
+                self._entries[s] = result
+                self._chars += len(s) + len(result)
+                while len(self._entries) > self.maxsize or self._chars > self.max_total_chars:
+                    line, evicted = self._entries.popitem(last=False)
+                    self._chars -= len(line) + len(evicted)
+        return result
+
+    def cache_clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+            self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "chars": self._chars,
+            "max_total_chars": self.max_total_chars,
+        }
+
+def _lower_ascii(s):
+    return unicodeToAscii(s.lower().strip())
+
+def _translate(table):
+    return lambda s: s.translate(table)
+
+def _sub(pattern, repl):
+    return lambda s: pattern.sub(repl, s)
+
+def _join_signs(s):
+    # Every character is a separate sign/token
+    return ' '.join(s)
+
+# The Unicode cuneiform blocks (signs, numbers and punctuation, Early
+# Dynastic).  None of these characters is touched by remove_brackets,
+# gap_filler, remove_doc_refs or fix_suprasigillum, so a line made only of
+# signs and whitespace normalizes to its signs spaced out, with words three
+# spaces apart.
+CUNEIFORM_SIGNS = '\U00012000-\U0001254F'
+CUNEIFORM_LINE_PATTERN = re.compile(f'[{CUNEIFORM_SIGNS}\\s]*')
+
+def _cuneiform_fast_path(pipeline):
+    def normalize_cuneiform(s):
+        if CUNEIFORM_LINE_PATTERN.fullmatch(s):
+            return ' '.join(' '.join(s.split()))
+        return pipeline(s)
+    return normalize_cuneiform
+
+# The body normalization of each normalizeString_* variant; the functions
+# below only add the task prefix.  Lines recur across tablets (parallel
+# editions, re-uploads), so the cuneiform and transliteration pipelines
+# remember their recent results.
+NORMALIZERS = {
+    "en": Normalizer(
+        _lower_ascii,
+        _sub(EN_SEPARATOR_PATTERN, ' '),
+        str.strip,
+        _translate(REMOVE_BRACKETS_TRANS),
+        gap_filler,
+    ),
+    "transliteration_simple": MemoizedNormalizer(Normalizer(
+        _lower_ascii,
+        _translate(REMOVE_BRACKETS_DIGITS_TRANS),
+        _sub(NON_LETTER_PATTERN, ' '),
+        gap_filler,
+        fix_cuneiform_gap,
+    )),
+    "transliteration_original": MemoizedNormalizer(Normalizer(
+        _lower_ascii,
+        _translate(REMOVE_BRACKETS_DIGITS_TRANS),
+        gap_filler,
+        remove_doc_refs,
+        fix_cuneiform_gap,
+    )),
+    "transliteration_group": MemoizedNormalizer(Normalizer(
+        _lower_ascii,
+        _translate(NORMALIZE_DIGITS_TRANS),
+        gap_filler,
+        remove_doc_refs,
+        fix_cuneiform_gap,
+    )),
+    # Unknown transliteration types are only trimmed, as before
+    "transliteration": Normalizer(
+        str.strip,
+        fix_cuneiform_gap,
+    ),
+    "transliteration_minimal": MemoizedNormalizer(Normalizer(
+        _lower_ascii,
+        _translate(NORMALIZE_DIGITS_TRANS),
+        gap_filler,
+        remove_doc_refs,
+    )),
+    "cuneiform": MemoizedNormalizer(_cuneiform_fast_path(Normalizer(
+        _translate(REMOVE_BRACKETS_TRANS),
+        gap_filler,
+        remove_doc_refs,
+        _join_signs,
+        fix_suprasigillum,
+    ))),
+}
+
+def normalizer_cache_stats():
+    """
+    Hit statistics of every memoized normalization pipeline.
+    """
+    return {name: normalizer.stats() for name, normalizer in NORMALIZERS.items() if isinstance(normalizer, MemoizedNormalizer)}
+
+def clear_normalizer_caches():
+    for normalizer in NORMALIZERS.values():
+        if isinstance(normalizer, MemoizedNormalizer):
+            normalizer.cache_clear()
+
+def normalize_transliteration(s, type="simple"):
+    """
+    Body normalization shared by the transliteration normalizeString_* functions.
+    """
+    return NORMALIZERS.get("transliteration_" + str(type), NORMALIZERS["transliteration"])(s)
 
 # Lowercase, trim, and remove non-letter characters
 def normalizeString_en(s, use_prefix=False, task="Translate", target="cuneiform", type="simple", language="Akkadian", modern="English"):
-    s = unicodeToAscii(s.lower().strip())
-    s = re.sub(r"([.!?])", r" \1", s)
-    s = re.sub(r"[^a-zA-Z!?*]+", r" ", s)
-    s = s.strip()
-    s = remove_brackets(s)
-    s = gap_filler(s)
-    s = remove_doc_refs(s)
+    s = NORMALIZERS["en"](s)
     #s = fix_cuneiform_gap(s)
     if use_prefix:
         if task=="Translate":
@@ -203,30 +423,7 @@ def normalizeString_en(s, use_prefix=False, task="Translate", target="cuneiform"
 
 # Lowercase, trim, and remove non-letter characters
 def normalizeString_cuneiform_transliterate(s, use_prefix=True, type="simple", language="Akkadian"):
-    if type == "simple":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = re.sub(r"([.!?])", r" \1", s)
-        s = re.sub(r"[^a-zA-Z!?*]+", r" ", s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type == "original":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type == "group":
-        s = unicodeToAscii(s.lower().strip())
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-    normalized_string = s.strip()
-    # 3) Fix spaced-out cuneiform gap tokens
-    normalized_string = fix_cuneiform_gap(normalized_string)
+    normalized_string = normalize_transliteration(s, type)
     if use_prefix:
         if type == "simple":
             return 'Transliterate ' + language + ' cuneiform to simple Latin characters: ' + normalized_string
@@ -237,30 +434,7 @@ def normalizeString_cuneiform_transliterate(s, use_prefix=True, type="simple", l
 
 # Lowercase, trim, and remove non-letter characters
 def normalizeString_cuneiform_rev_transliterate(s, use_prefix=True, type="simple", language="Akkadian"):
-    if type == "simple":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = re.sub(r"([.!?])", r" \1", s)
-        s = re.sub(r"[^a-zA-Z!?*]+", r" ", s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type == "original":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type == "group":
-        s = unicodeToAscii(s.lower().strip())
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-    normalized_string = s.strip()
-    # 3) Fix spaced-out cuneiform gap tokens
-    normalized_string = fix_cuneiform_gap(normalized_string)
+    normalized_string = normalize_transliteration(s, type)
     if use_prefix:
         if type == "simple" :
             return 'Convert simple transliterated Latin characters to ' + language + ' cuneiform: ' + normalized_string
@@ -273,30 +447,7 @@ def normalizeString_cuneiform_rev_transliterate(s, use_prefix=True, type="simple
 
 # Lowercase, trim, and remove non-letter characters
 def normalizeString_cuneiform_transliterate_translate(s, use_prefix=True, task="Translate", type="simple", language="Akkadian", modern="English"):
-    if type=="simple":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = re.sub(r"([.!?])", r" \1", s)
-        s = re.sub(r"[^a-zA-Z!?*]+", r" ", s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type=="original":
-        s = unicodeToAscii(s.lower().strip())
-        s = remove_brackets(s)
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-        s = re.sub(r'\s+', ' ', s).strip()
-    elif type == "group":
-        s = unicodeToAscii(s.lower().strip())
-        s = normalize_digits(s)
-        s = gap_filler(s)
-        s = remove_doc_refs(s)
-    normalized_string = s.strip()
-    # 3) Fix spaced-out cuneiform gap tokens
-    normalized_string = fix_cuneiform_gap(normalized_string)
+    normalized_string = normalize_transliteration(s, type)
     if use_prefix:
         if task == "Translate":
             if type == "simple":
@@ -315,41 +466,19 @@ def normalizeString_cuneiform_transliterate_translate(s, use_prefix=True, task="
 
 # Lowercase, trim, and remove non-letter characters
 def normalizeString_cuneiform_transliterate_minimal(s, use_prefix=True, language="Akkadian", modern="English"):
-    s = unicodeToAscii(s.lower().strip())
-    s = normalize_digits(s)
-    s = gap_filler(s)
-    s = remove_doc_refs(s)
-    #s = re.sub(r"([.!?])", r" \1", s)
-    #s = re.sub(r"[^a-zA-Z!?]+", r" ", s)
-    #s = remove_brackets(s)
-    normalized_string = s.strip()
-    # 3) Fix spaced-out cuneiform gap tokens
-    #normalized_string = fix_cuneiform_gap(normalized_string)
+    normalized_string = NORMALIZERS["transliteration_minimal"](s)
     if use_prefix:
         return 'Translate ' + language + ' grouped transliteration to ' + modern + ': ' + normalized_string
     else:
         return normalized_string
 
-def fix_suprasigillum(text):
-    # This pattern means:
-    #  - 's' followed by 1+ non-word characters (spaces, etc.)
-    #  - 'u' followed by 1+ non-word chars
-    #  - 'p' ...
-    #  - and so on until 'm'
-    pattern = r"s\W+u\W+p\W+r\W+a\W+s\W+i\W+g\W+i\W+l\W+l\W+u\W+m"
-    return re.sub(pattern, "suprasigillum", text)
-
 
 def normalizeString_cuneiform(s, use_prefix=True, task="Translate", type="simple", language="Akkadian", modern="English"):
     # Optional: Remove unwanted modern characters, if any (adjust regex as needed)
     # s = re.sub(r'[^\u12000-\u123FF\u12400-\u1247F]+', '', s)  # Adjust Unicode ranges to cuneiform and related characters
     # Split each character/sign into separate entries
     # This assumes each character in the string is a distinct sign, no need to join with spaces if already separated
-    s = remove_brackets(s)
-    s = gap_filler(s)
-    s = remove_doc_refs(s)
-    normalized_string = ' '.join(s)  # This joins every character with a space, treating each as a separate token
-    normalized_string = fix_suprasigillum(normalized_string)
+    normalized_string = NORMALIZERS["cuneiform"](s)
     # Add the prefix if use_prefix is True
     if use_prefix:
         if task == "Translate":
@@ -364,20 +493,53 @@ def normalizeString_cuneiform(s, use_prefix=True, task="Translate", type="simple
     else:
         return normalized_string
 
+@functools.lru_cache(maxsize=None)
+def prompt_prefixes(language="Akkadian", modern="English"):
+    """
+    Every task prefix the normalizeString_* functions can put before a
+    body (e.g. "Translate Akkadian cuneiform to English: "), longest first.
+    """
+    prompts = [normalizeString_cuneiform_transliterate_minimal('', language=language, modern=modern)]
+    for type in ("simple", "group", "original"):
+        prompts += [
+            normalizeString_en('', use_prefix=True, target=target, type=type, language=language, modern=modern)
+            for target in ("cuneiform", "transliteration")
+        ]
+        prompts.append(normalizeString_cuneiform_transliterate('', type=type, language=language))
+        prompts.append(normalizeString_cuneiform_rev_transliterate('', type=type, language=language))
+        prompts += [
+            normalizeString_cuneiform_transliterate_translate('', task=task, type=type, language=language, modern=modern)
+            for task in ("Translate", "Group")
+        ]
+        prompts += [
+            normalizeString_cuneiform('', task=task, type=type, language=language, modern=modern)
+            for task in ("Translate", "Transliterate")
+        ]
+    # Combinations a normalizer has no prefix for give None
+    return tuple(sorted({prompt for prompt in prompts if prompt}, key=len, reverse=True))
+
+# ". . ." (with any spacing) marks a gap in the source files
+DOTS_GAP_PATTERN = re.compile(r'\s*\.\s*\.\s*\.\s*')
+
 def read_and_process_file(file_path):
-    # Check if the file_path is a URL
-    if file_path.startswith('http://') or file_path.startswith('https://'):
-        # Fetch the content from the URL
-        response = requests.get(file_path)
-        response.raise_for_status()  # Raises an HTTPError for bad responses
-        lines = response.text.strip().split('\n')
-    else:
-        # Open the local file and read the lines
-        with open(file_path, 'r', encoding='utf-8') as file:
-            lines = file.read().strip().split('\n')
-    # Replace ". . . " with "*" in each line
-    processed_lines = [re.sub(r'\s*\.\s*\.\s*\.\s*', '*', line) for line in lines]
-    return processed_lines
+    """
+    The lines of a local file or http(s) URL, with ". . . " replaced by "*"
+    in each line.  See ingest.iter_sources for reading many sources at once.
+    """
+    from ingest import iter_source_lines
+    return list(iter_source_lines(file_path))
+
+def iter_processed_lines(file_path, start=0):
+    """
+    Lazily yield (line_number, line) from a local file, with ". . ." replaced
+    by "*" as in read_and_process_file.  Lines before ``start`` are skipped
+    without being processed.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file):
+            if line_number < start:
+                continue
+            yield line_number, DOTS_GAP_PATTERN.sub('*', line.rstrip('\r\n'))
 
 def convert(lst):
    res_dict = {}
@@ -389,7 +551,7 @@ def collapse_spaces(obj):
     # This function now does no printing.
     # Just processes the string(s) and returns them silently.
     def _collapse_spaces_in_string(s):
-        return re.sub(r'\s+', ' ', s).strip()
+        return WHITESPACE_PATTERN.sub(' ', s).strip()
     if isinstance(obj, str):
         return _collapse_spaces_in_string(obj)
     elif isinstance(obj, (tuple, list)) and len(obj) == 2 and all(isinstance(x, str) for x in obj):
@@ -400,78 +562,125 @@ def collapse_spaces(obj):
     else:
         raise ValueError(f"Expected a single string or a 2-string pair, got: {obj}")
 
-import re
-import unicodedata
-
 def remove_control_characters(s):
     """
     Remove all Cc, Cf, Cs, Co, Cn categories — i.e. non-printable/control chars.
     """
-    return "".join(ch for ch in s if unicodedata.category(ch)[0] != "C")
+    if s.isprintable():
+        # Printable strings have no C* characters (nor Z* ones but the space)
+        return s
+    return s.translate(CONTROL_CHARACTERS)
 
 def normalize(text):
     # 1. Remove control characters (not just ASCII)
     text = remove_control_characters(text)
     # 2. Replace consecutive whitespace with a single space
-    text = re.sub(r"\s+", " ", text)
+    text = WHITESPACE_PATTERN.sub(" ", text)
     # 3. Trim
     text = text.strip()
     return text
 
+def normalize_truncate(text, max_length):
+    """
+    Normalize, truncate to ``max_length`` characters and normalize again, as
+    trim_pairs / trim_singles do for each side.
+    """
+    return normalize(normalize(text)[:max_length])
+
 def trim_singles(pairs, max_length1, max_length2, max_length_threshold, min_length_threshold):
-    # 1. Filter out any pair where pair is None or pair[0] is None
-    valid_pairs = []
+    trimmed_pairs = []
     for pair in pairs:
         # Make sure the pair itself is not None AND has at least one element
-        if pair and pair[0]:
-            valid_pairs.append(pair)
-    # 2. Filter out pairs by word count threshold
-    max_filtered_pairs = [
-        p for p in valid_pairs
-        if len(p[0].split()) <= max_length_threshold
-    ]
-    min_filtered_pairs = [
-        p for p in max_filtered_pairs
-        if len(p[0].split()) >= min_length_threshold
-    ]
-    # 3. Normalize and trim
-    trimmed_pairs = []
-    for p in min_filtered_pairs:
-        s1 = p[0]  # p is presumably a 1-element tuple or a 1-element list
-        # Normalize
-        s1_norm = normalize(s1)
-        # Truncate
-        s1_trunc = s1_norm[:max_length1]
-        # Normalize again just to be safe
-        s1_final = normalize(s1_trunc)
-        trimmed_pairs.append(s1_final)
+        if not (pair and pair[0]):
+            continue
+        s1 = pair[0]  # pair is presumably a 1-element tuple or a 1-element list
+        # Filter out pairs by word count threshold
+        n1 = len(s1.split())
+        if not min_length_threshold <= n1 <= max_length_threshold:
+            continue
+        # Normalize, truncate, and normalize again just to be safe
+        trimmed_pairs.append(normalize_truncate(s1, max_length1))
     return trimmed_pairs
 
 def trim_pairs(pairs, max_length1, max_length2, max_length_threshold, min_length_threshold):
-    valid_pairs = []
+    trimmed_pairs = []
     for pair in pairs:
         # Ensure the pair has 2 elements and neither is None
-        if pair and len(pair) == 2 and pair[0] and pair[1]:
-            valid_pairs.append(pair)
-    # Filter out pairs by word count threshold
-    max_filtered_pairs = [
-        (s1, s2) for s1, s2 in valid_pairs
-        if len(s1.split()) <= max_length_threshold and len(s2.split()) <= (max_length_threshold - 5)
-    ]
-    min_filtered_pairs = [
-        (s1, s2) for s1, s2 in max_filtered_pairs
-        if len(s1.split()) >= min_length_threshold and len(s2.split()) >= min_length_threshold
-    ]
-    trimmed_pairs = []
-    for s1, s2 in min_filtered_pairs:
-        # Normalize
-        s1_norm = normalize(s1)
-        s2_norm = normalize(s2)
-        # Truncate
-        s1_trunc = s1_norm[:max_length1]
-        s2_trunc = s2_norm[:max_length2]
-        # Normalize again
-        s1_final = normalize(s1_trunc)
-        s2_final = normalize(s2_trunc)
-        trimmed_pairs.append((s1_final, s2_final))
+        if not (pair and len(pair) == 2 and pair[0] and pair[1]):
+            continue
+        s1, s2 = pair
+        # Filter out pairs by word count threshold
+        n1 = len(s1.split())
+        n2 = len(s2.split())
+        if not (min_length_threshold <= n1 <= max_length_threshold and min_length_threshold <= n2 <= max_length_threshold - 5):
+            continue
+        # Normalize, truncate, and normalize again
+        trimmed_pairs.append((normalize_truncate(s1, max_length1), normalize_truncate(s2, max_length2)))
     return trimmed_pairs
+
+def _normalize_truncate_chunk(args):
+    texts, max_length = args
+    return [normalize_truncate(text, max_length) for text in texts]
+
+def normalize_truncate_column(texts, max_length, processes=None, chunksize=20000):
+    """
+    normalize_truncate over a list of strings, fanned out across ``processes``
+    worker processes in chunks when more than one is requested.
+    """
+    if not processes or processes < 2 or len(texts) <= chunksize:
+        return _normalize_truncate_chunk((texts, max_length))
+    from concurrent.futures import ProcessPoolExecutor
+    chunks = [(texts[i:i + chunksize], max_length) for i in range(0, len(texts), chunksize)]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        return [text for chunk in pool.map(_normalize_truncate_chunk, chunks) for text in chunk]
+
+def _text_column(frame, column):
+    # Only non-empty strings count, like the truthiness checks in trim_pairs
+    texts = frame.iloc[:, column]
+    return texts.where(texts.map(lambda text: isinstance(text, str) and text != ''))
+
+def _word_counts(texts):
+    # Same as len(text.split()) for every row, without a Python-level split
+    return texts.str.count(r'\S+')
+
+def trim_pairs_batch(pairs, max_length1, max_length2, max_length_threshold, min_length_threshold, processes=None, chunksize=20000):
+    """
+    trim_pairs for large corpora.
+
+    ``pairs`` is either a pandas DataFrame whose first two columns are the
+    source and target texts, or any iterable of pairs.  Word counts are
+    computed once with vectorized string operations, the length filter is a
+    single boolean mask, and normalization can be spread over ``processes``
+    worker processes.  Returns the same list of tuples as trim_pairs.
+    """
+    import pandas as pd
+    if not isinstance(pairs, pd.DataFrame):
+        pairs = pd.DataFrame(
+            [(pair[0], pair[1]) for pair in pairs if pair and len(pair) == 2],
+            columns=["source", "target"],
+        )
+    source = _text_column(pairs, 0)
+    target = _text_column(pairs, 1)
+    n1 = _word_counts(source)
+    n2 = _word_counts(target)
+    keep = (
+        source.notna() & target.notna()
+        & (n1 >= min_length_threshold) & (n1 <= max_length_threshold)
+        & (n2 >= min_length_threshold) & (n2 <= max_length_threshold - 5)
+    )
+    s1 = normalize_truncate_column(source[keep].tolist(), max_length1, processes, chunksize)
+    s2 = normalize_truncate_column(target[keep].tolist(), max_length2, processes, chunksize)
+    return list(zip(s1, s2))
+
+def trim_singles_batch(pairs, max_length1, max_length2, max_length_threshold, min_length_threshold, processes=None, chunksize=20000):
+    """
+    trim_singles for large corpora; see trim_pairs_batch.  A DataFrame's first
+    column, or the first element of each item, is used.
+    """
+    import pandas as pd
+    if not isinstance(pairs, pd.DataFrame):
+        pairs = pd.DataFrame([(pair[0],) for pair in pairs if pair], columns=["source"])
+    source = _text_column(pairs, 0)
+    n1 = _word_counts(source)
+    keep = source.notna() & (n1 >= min_length_threshold) & (n1 <= max_length_threshold)
+    return normalize_truncate_column(source[keep].tolist(), max_length1, processes, chunksize)
@@ -0,0 +1,71 @@
+import functools
+
+from normalization import (
+    normalize,
+    normalizeString_cuneiform,
+    normalizeString_cuneiform_transliterate_translate,
+    normalizeString_en,
+)
+
+# Define your available prompt styles
+PROMPT_STYLES = {
+    "Translate cuneiform": "Translate Akkadian cuneiform to English: ",
+    "Translate transliteration": "Translate complex Akkadian transliteration to English: ",
+    "Translate uncertain transliteration": "Translate simple Akkadian transliteration to English: ",
+    "Translate English to cuneiform": "Translate English to Akkadian cuneiform: ",
+    "Translate English to transliteration": "Translate English to complex Akkadian transliteration: ",
+    "Transliterate cuneiform": "Transliterate Akkadian cuneiform to complex Latin characters: "
+}
+
+def normalize_prompt(text, prompt_key, language="Akkadian"):
+    """
+    Normalize ``text`` and add the task prefix for the selected prompt style,
+    naming ``language`` as the ancient language (e.g. "Sumerian" for a model
+    trained on Sumerian).
+    """
+    # Choose the correct normalization function based on the prompt key
+    if prompt_key == "Translate cuneiform":
+        return normalizeString_cuneiform(
+            text, use_prefix=True, task="Translate", language=language
+        )
+    elif prompt_key == "Translate transliteration":
+        return normalizeString_cuneiform_transliterate_translate(
+            text, use_prefix=True, task="Translate", type="original", language=language
+        )
+    elif prompt_key == "Translate uncertain transliteration":
+        return normalizeString_cuneiform_transliterate_translate(
+            text, use_prefix=True, task="Translate", type="simple", language=language
+        )
+    elif prompt_key == "Translate English to cuneiform":
+        return normalizeString_en(
+            text, use_prefix=True, task="Translate", target="cuneiform", language=language
+        )
+    elif prompt_key == "Translate English to transliteration":
+        return normalizeString_en(
+            text, use_prefix=True, task="Translate", target="transliteration", type="original", language=language
+        )
+    elif prompt_key == "Transliterate cuneiform":
+        return normalizeString_cuneiform(
+            text, use_prefix=True, task="Transliterate", type="original", language=language
+        )
+    else:
+        # Fallback: if no valid prompt is selected, just use a stripped version of the text
+        return normalize(text)
+
+@functools.lru_cache(maxsize=None)
+def style_prefixes(languages=("Akkadian",)):
+    """
+    ``(task prefix, PROMPT_STYLES key)`` pairs of every style in each of
+    ``languages``.
+    """
+    return tuple((normalize_prompt('', key, language), key) for language in languages for key in PROMPT_STYLES)
+
+def prompt_style_of(prompt, languages=("Akkadian",)):
+    """
+    The PROMPT_STYLES key whose task prefix, in one of ``languages``,
+    ``prompt`` starts with, or "other" for prompts without one.
+    """
+    for prefix, key in style_prefixes(tuple(languages)):
+        if prompt.startswith(prefix):
+            return key
+    return "other"
@@ -0,0 +1,102 @@
+import os, queue, threading, time, weakref
+from concurrent.futures import Future
+
+class BatchScheduler:
+    """
+    Collects translation requests from concurrent callers and runs them
+    through ``translate_fn`` in micro-batches.
+
+    A background thread waits for the first pending request, then keeps
+    collecting for up to ``max_wait_ms`` milliseconds or until
+    ``max_batch_size`` requests are queued.  Requests with different
+    generation parameters never share a batch.  ``translate_fn(texts, **kwargs)``
+    must return one result per text, in order.
+
+    The scheduler can be created before the process forks (e.g. a preloaded
+    gunicorn app): a child starts its own queue and thread on first use.
+    """
+    def __init__(self, translate_fn, max_batch_size=8, max_wait_ms=10.0):
+        self.translate_fn = translate_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._reset()
+        # After a fork the parent's thread does not exist in the child, and
+        # its queue and lock may have been copied while in use
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._reset())
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit_async(self, text, **generate_kwargs):
+        """
+        Queue ``text`` and return a Future resolving to its translation.
+        """
+        self.start()
+        future = Future()
+        self._queue.put((text, generate_kwargs, future))
+        return future
+
+    def submit(self, text, timeout=None, **generate_kwargs):
+        """
+        Queue ``text`` and block until its translation is ready.
+        """
+        return self.submit_async(text, **generate_kwargs).result(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch):
+        # Group by generation parameters; only identical settings can share
+        # one generate call.
+        groups = {}
+        for text, generate_kwargs, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            key = tuple(sorted(generate_kwargs.items()))
+            groups.setdefault(key, []).append((text, future))
+        for key, items in groups.items():
+            try:
+                results = self.translate_fn([text for text, _ in items], **dict(key))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(items, results):
+                    future.set_result(result)
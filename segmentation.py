@@ -0,0 +1,113 @@
+"""
+Split long inputs into model-sized segments and join their translations.
+
+A whole tablet encoded as one sequence is either truncated or pays quadratic
+attention cost over a very long encoder input.  segment_prompts() cuts the
+raw text into pieces whose normalized prompts fit ``max_size`` (measured
+with ``measure``, e.g. a token count), preferring to cut at line ends, then
+after gaps (words gap_filler turns into "*"), then between any two words,
+but never inside a run gap_filler replaces as a whole (e.g. "x x x").
+The pieces are translated as one batch and joined back in order.
+"""
+import re
+
+from normalization import GAP_FILLER_PATTERN, gap_filler
+from prompts import normalize_prompt
+
+# Preference for cutting after a word
+LINE_BREAK, GAP_BREAK, WORD_BREAK, NO_BREAK = 2, 1, 0, -1
+
+WORD_PATTERN = re.compile(r'\S+')
+
+def _is_gap(word):
+    return '*' in word or gap_filler(word) == '*'
+
+def _gap_run_ends(line):
+    # Where words end inside a gap_filler match spanning several words
+    # (". . .", "x x x"), so that cutting there would change its output
+    return {
+        word.end()
+        for match in GAP_FILLER_PATTERN.finditer(line) if ' ' in match.group()
+        for word in WORD_PATTERN.finditer(line, match.start(), match.end())
+        if word.end() < match.end()
+    }
+
+def _split_word(word, cost, budget, word_cost):
+    # A single word longer than the budget (e.g. unspaced cuneiform signs) is
+    # cut into runs of characters that fit, each charged its own cost
+    size = max(1, len(word) * budget // cost)
+    pieces = []
+    for i in range(0, len(word), size):
+        piece = word[i:i + size]
+        piece_cost = word_cost(piece)
+        if piece_cost > budget and len(piece) > 1:
+            pieces += _split_word(piece, piece_cost, budget, word_cost)
+        else:
+            pieces.append((piece, piece_cost))
+    return pieces
+
+def segment_prompts(text, prompt_key, max_size, measure=len, language="Akkadian"):
+    """
+    Normalize ``text`` for ``prompt_key`` (and ``language``) into one or
+    more prompts of at most about ``max_size`` (as counted by ``measure``).  Text that fits is
+    returned as the single prompt normalize_prompt() gives.
+    """
+    prompt = normalize_prompt(text, prompt_key, language)
+    if measure(prompt) <= max_size:
+        return [prompt]
+
+    prefix = normalize_prompt("", prompt_key, language)
+    budget = max(1, max_size - measure(prefix))
+    def word_cost(word):
+        return measure(normalize_prompt(word, prompt_key, language)[len(prefix):]) + 1
+
+    # (word, cost, break preference after it), in order
+    words = []
+    for line in text.splitlines():
+        run_ends = _gap_run_ends(line)
+        line_words = list(WORD_PATTERN.finditer(line))
+        for match in line_words:
+            word = match.group()
+            cost = word_cost(word)
+            pieces = _split_word(word, cost, budget, word_cost) if cost > budget else [(word, cost)]
+            for piece, piece_cost in pieces:
+                words.append([piece, piece_cost, WORD_BREAK])
+            if match.end() in run_ends:
+                words[-1][2] = NO_BREAK
+            elif _is_gap(word):
+                words[-1][2] = GAP_BREAK
+        if line_words:
+            words[-1][2] = LINE_BREAK
+
+    segments = []
+    start, size = 0, 0
+    for end, (_, cost, _) in enumerate(words):
+        # What is carried over after a cut may still not leave room
+        while end > start and size + cost > budget:
+            # Cut at the best break in the second half of the segment (at
+            # its end if there is none)
+            cut, best, running = end, WORD_BREAK, 0
+            for i in range(start, end):
+                running += words[i][1]
+                if running * 2 >= size and words[i][2] >= best:
+                    cut, best = i + 1, words[i][2]
+            segments.append(words[start:cut])
+            start, size = cut, sum(word[1] for word in words[cut:end])
+        size += cost
+    segments.append(words[start:])
+
+    prompts = []
+    for segment in segments:
+        raw = "".join(
+            word + ("\n" if brk == LINE_BREAK else " ") for word, _, brk in segment
+        )
+        prompts.append(normalize_prompt(raw, prompt_key, language))
+    return prompts
+
+def join_translations(translations):
+    """
+    Reassemble the translations of a text's segments, in order.
+    """
+    if len(translations) == 1:
+        return translations[0]
+    return " ".join(translation.strip() for translation in translations if translation.strip())
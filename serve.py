@@ -0,0 +1,88 @@
+"""
+Run the translator under gunicorn for production.
+
+    pip install gunicorn
+    python serve.py --bind 0.0.0.0:8000 --workers 4 --torch-threads 2
+
+This needs gunicorn, besides the app's own requirements (Flask, torch and
+transformers); gunicorn runs on Unix only.
+
+The model is loaded (and warmed up) once in the master process before the
+workers are forked, so its weights are shared copy-on-write instead of each
+worker holding its own copy; gc.freeze() keeps the garbage collector from
+touching, and thereby copying, the pages of objects created up to then.
+Each worker then sets its own torch intra-op thread count, by default the
+CPU count divided evenly among the workers.
+
+Every worker lets at most --max-pending requests wait for generation and
+answers the rest with 503 and Retry-After (see AKK_MAX_PENDING in app.py).
+Metrics at /metrics are per worker.
+
+onnxruntime sessions are not safe to fork, so with AKK_BACKEND=onnx each
+worker loads its own copy after forking.  A SQLite translation cache
+(AKK_CACHE_PATH) is reopened in each worker, since SQLite connections must
+not be shared across fork().
+
+With several models (AKK_MODELS, see model_registry.py) only the default
+one is preloaded; the others are loaded by each worker on first use, and
+the memory budget applies to each worker separately.
+"""
+import argparse, gc, os
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the translator with gunicorn.")
+    parser.add_argument("--bind", default=os.environ.get("AKK_BIND", "127.0.0.1:8000"))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("AKK_WORKERS", 2)))
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("AKK_THREADS", 8)),
+                        help="request threads per worker")
+    parser.add_argument("--torch-threads", type=int, default=int(os.environ.get("AKK_TORCH_THREADS", 0)),
+                        help="torch intra-op threads per worker (default: CPUs / workers)")
+    parser.add_argument("--max-pending", type=int, default=int(os.environ.get("AKK_MAX_PENDING", 32)),
+                        help="requests per worker that may wait for generation before 503s")
+    parser.add_argument("--timeout", type=int, default=120, help="seconds before a silent worker is restarted")
+    args = parser.parse_args(argv)
+
+    # Read by app.py at import
+    os.environ["AKK_MAX_PENDING"] = str(args.max_pending)
+    torch_threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        parser.exit(1, "serve.py needs gunicorn: pip install gunicorn\n")
+    import app as app_module
+
+    preload = app_module.registry.entry().backend != "onnx"
+    if preload:
+        app_module.warm_up()
+        gc.freeze()
+
+    def post_fork(server, worker):
+        import torch
+        torch.set_num_threads(torch_threads)
+        if hasattr(app_module.cache, "reopen"):
+            app_module.cache.reopen()
+        if not preload:
+            app_module.warm_up_in_background()
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": args.bind,
+                "workers": args.workers,
+                "threads": args.threads,
+                "worker_class": "gthread",
+                "timeout": args.timeout,
+                "preload_app": True,
+                "post_fork": post_fork,
+            }
+            for name, value in options.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return app_module.app
+
+    Server().run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Translate a corpus file line by line from the command line.
+
+    python translate_corpus.py tablets.txt out.jsonl --prompt "Translate transliteration"
+
+Lines are read lazily, normalized for the chosen prompt style, translated in
+length buckets under a padded-token budget (see translation.translate_bucketed)
+and appended to a JSONL or CSV file as they complete.
+A checkpoint file records how many input lines are done, so an interrupted
+run continues where it stopped with ``--resume``.  The input may also be a
+corpus directory saved by corpus.PairCorpus, whose --column is translated.
+"""
+import argparse, csv, itertools, json, os, sys
+
+from normalization import iter_processed_lines
+from prompts import PROMPT_STYLES, normalize_prompt
+from translation import load_model, translate_bucketed
+
+OUTPUT_FIELDS = ["line", "source", "translation"]
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8') as file:
+        return int(file.read().strip() or 0)
+
+def write_checkpoint(path, offset):
+    # Write-then-rename so a crash never leaves a half-written offset
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(str(offset))
+    os.replace(tmp_path, path)
+
+def length_sorted_batches(items, batch_size):
+    """
+    Split ``items`` (tuples whose last element is the prompt) into batches of
+    similar prompt length, so little of each batch is padding.
+    """
+    ordered = sorted(items, key=lambda item: len(item[-1]))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+def translate_lines(lines, translate_fn, prompt_key, batch_size=16, window=1024):
+    """
+    Normalize and translate ``(line_number, text)`` pairs.
+
+    Lines are consumed ``window`` at a time; each window is sorted by length
+    into batches for ``translate_fn(prompts)`` and yielded back as a list of
+    ``(line_number, source, translation)`` in input order, followed by the
+    line number the next window starts at.  Blank lines are skipped.
+    """
+    lines = iter(lines)
+    while True:
+        chunk = list(itertools.islice(lines, window))
+        if not chunk:
+            return
+        pending = [
+            (line_number, text, normalize_prompt(text, prompt_key))
+            for line_number, text in chunk if text.strip()
+        ]
+        translations = {}
+        for batch in length_sorted_batches(pending, batch_size):
+            for (line_number, _, _), translation in zip(batch, translate_fn([prompt for _, _, prompt in batch])):
+                translations[line_number] = translation
+        results = [(line_number, text, translations[line_number]) for line_number, text, _ in pending]
+        yield results, chunk[-1][0] + 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate a corpus file line by line.")
+    parser.add_argument("input", help="local text file, one line of text per line, or a saved PairCorpus directory")
+    parser.add_argument("output", help="output file (.jsonl or .csv)")
+    parser.add_argument("--prompt", default="Translate cuneiform", choices=sorted(PROMPT_STYLES),
+                        help="prompt style used to normalize each line")
+    parser.add_argument("--model", default="Thalesian/AKK_60m", help="model name or local path")
+    parser.add_argument("--format", choices=["jsonl", "csv"],
+                        help="output format (default: from the output file extension)")
+    parser.add_argument("--batch-size", type=int, default=64, help="most lines per generate call")
+    parser.add_argument("--max-tokens", type=int, default=8192,
+                        help="padded input tokens per generate call (batch size x longest line)")
+    parser.add_argument("--length-ratio", type=float, default=3.0,
+                        help="cap each line's output at this many times its input tokens, plus 16 "
+                             "(0: always --max-length)")
+    parser.add_argument("--repetition-guard", type=int, default=16,
+                        help="stop a line whose output repeats itself over this many tokens (0: never)")
+    parser.add_argument("--window", type=int, default=1024,
+                        help="lines read and bucketed by length together before writing")
+    parser.add_argument("--max-length", type=int, default=512, help="maximum generated length")
+    parser.add_argument("--num-beams", type=int, default=1)
+    parser.add_argument("--column", default="source", choices=["source", "target"],
+                        help="column of a PairCorpus input to translate")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: OUTPUT.ckpt)")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip lines already recorded in the checkpoint and append to OUTPUT")
+    args = parser.parse_args(argv)
+
+    output_format = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+    checkpoint_path = args.checkpoint or args.output + ".ckpt"
+    start = read_checkpoint(checkpoint_path) if args.resume else 0
+
+    tokenizer, model = load_model(args.model)
+    def translate_fn(prompts):
+        return translate_bucketed(
+            model, tokenizer, prompts,
+            max_tokens=args.max_tokens, max_batch_size=args.batch_size, max_length=args.max_length,
+            length_ratio=args.length_ratio or None, repetition_guard=args.repetition_guard or None,
+            num_beams=args.num_beams,
+        )
+
+    appending = start > 0 and os.path.exists(args.output)
+    with open(args.output, 'a' if appending else 'w', encoding='utf-8', newline='') as out:
+        writer = csv.writer(out) if output_format == "csv" else None
+        if writer is not None and not appending:
+            writer.writerow(OUTPUT_FIELDS)
+        if os.path.isdir(args.input):
+            from corpus import PairCorpus
+            texts = getattr(PairCorpus.load(args.input), args.column)
+            lines = ((line_number, texts[line_number]) for line_number in range(start, len(texts)))
+        else:
+            lines = iter_processed_lines(args.input, start=start)
+        # Each window goes to translate_fn whole; it does its own bucketing
+        for results, offset in translate_lines(lines, translate_fn, args.prompt, args.window, args.window):
+            for line_number, source, translation in results:
+                if writer is not None:
+                    writer.writerow([line_number, source, translation])
+                else:
+                    out.write(json.dumps(dict(zip(OUTPUT_FIELDS, (line_number, source, translation))), ensure_ascii=False) + '\n')
+            out.flush()
+            write_checkpoint(checkpoint_path, offset)
+            print(f"{offset} lines done", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+import threading, time
+
+def load_tokenizer(model_name, fast=True):
+    """
+    The tokenizer for ``model_name``: the Rust-backed T5TokenizerFast when
+    ``fast`` and the tokenizers package can provide it (converting the
+    SentencePiece model if there is no tokenizer.json), the SentencePiece
+    T5Tokenizer otherwise.  Both give the same token ids.
+    """
+    from transformers import AutoTokenizer, T5Tokenizer
+    if fast:
+        try:
+            return AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        except (ImportError, ValueError, OSError) as e:
+            import logging
+            logging.getLogger(__name__).warning("no fast tokenizer for %s (%s); using T5Tokenizer", model_name, e)
+    return T5Tokenizer.from_pretrained(model_name)
+
+def load_model(model_name):
+    """
+    Load the T5 tokenizer and model for ``model_name`` (a hub name or local path).
+    """
+    # Import your T5 model and tokenizer (assuming you use Hugging Face transformers)
+    from transformers import T5ForConditionalGeneration
+    tokenizer = load_tokenizer(model_name)
+    model = T5ForConditionalGeneration.from_pretrained(model_name)
+    model.eval()
+    return tokenizer, model
+
+class LazyModel:
+    """
+    A model that is loaded on first use with ``loader(model_name)`` (by
+    default load_model, giving a tokenizer/model pair).
+
+    ``load()`` is thread-safe and loads at most once; concurrent callers wait
+    for the first load to finish.  ``ready`` tells whether it has happened.
+    """
+    def __init__(self, model_name, loader=load_model):
+        self.model_name = model_name
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded = None
+
+    @property
+    def ready(self):
+        return self._loaded is not None
+
+    def load(self):
+        if self._loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._loaded = self._loader(self.model_name)
+        return self._loaded
+
+    def unload(self):
+        """
+        Drop the loaded model (once callers still using it are done with it,
+        its memory is freed); the next ``load()`` loads it again.
+        """
+        with self._lock:
+            self._loaded = None
+
+class PromptEncoder:
+    """
+    Token ids of normalized prompts, reusing the ids of their task prefix.
+
+    A prompt starting with one of ``prefixes`` (by default every prefix of
+    normalization.prompt_prefixes in each of ``languages``) is encoded as the prefix's cached ids
+    followed by the ids of the body, so the prefix is tokenized once rather
+    than for every prompt.  SentencePiece never joins pieces across the
+    space ending a prefix, so this equals tokenizing the whole prompt; the
+    first ``verify`` prompts of each prefix are still checked against a full
+    tokenization, and a prefix that ever differs is not reused again.
+    """
+    def __init__(self, tokenizer, prefixes=None, verify=4, languages=("Akkadian",)):
+        if prefixes is None:
+            from normalization import prompt_prefixes
+            prefixes = [prefix for language in languages for prefix in prompt_prefixes(language)]
+        self.tokenizer = tokenizer
+        self.prefixes = sorted(prefixes, key=len, reverse=True)
+        self.verify = verify
+        # prefix -> its ids, or None once it has failed verification
+        self._ids = {}
+        self._verified = {}
+
+    def _prefix_of(self, text):
+        for prefix in self.prefixes:
+            if text.startswith(prefix):
+                return prefix if self._ids.get(prefix, ()) is not None else None
+        return None
+
+    def _prefix_ids(self, prefix):
+        ids = self._ids.get(prefix)
+        if ids is None:
+            ids = self._ids[prefix] = self.tokenizer(prefix.rstrip(), add_special_tokens=False)["input_ids"]
+        return ids
+
+    def encode(self, texts):
+        """
+        A list of token ids (with the end-of-sequence token, unpadded) per text.
+        """
+        # Never pass padding or truncation here: a fast tokenizer changes
+        # its settings for them, which fails while another thread encodes
+        texts = list(texts)
+        prefixes = [self._prefix_of(text) for text in texts]
+        whole = [i for i, prefix in enumerate(prefixes) if prefix is None]
+        split = [i for i, prefix in enumerate(prefixes) if prefix is not None]
+        encoded = [None] * len(texts)
+        if whole:
+            for i, ids in zip(whole, self.tokenizer([texts[i] for i in whole])["input_ids"]):
+                encoded[i] = ids
+        if split:
+            bodies = self.tokenizer([texts[i][len(prefixes[i]):] for i in split])["input_ids"]
+            for i, body in zip(split, bodies):
+                prefix = prefixes[i]
+                encoded[i] = self._prefix_ids(prefix) + body
+                if self._verified.get(prefix, 0) < self.verify:
+                    self._verified[prefix] = self._verified.get(prefix, 0) + 1
+                    full = self.tokenizer(texts[i])["input_ids"]
+                    if full != encoded[i]:
+                        self._ids[prefix] = None
+                        encoded[i] = full
+        return encoded
+
+def encode_prompts(tokenizer, texts):
+    """
+    ``PromptEncoder.encode`` with one encoder kept per tokenizer (the
+    default one unless set_prompt_languages installed another).
+    """
+    encoder = getattr(tokenizer, "_prompt_encoder", None)
+    if encoder is None:
+        encoder = tokenizer._prompt_encoder = PromptEncoder(tokenizer)
+    return encoder.encode(texts)
+
+def set_prompt_languages(tokenizer, languages):
+    """
+    Reuse the task prefix ids of prompts in each of ``languages`` (e.g.
+    "Sumerian") when encoding with ``tokenizer``.
+    """
+    tokenizer._prompt_encoder = PromptEncoder(tokenizer, languages=tuple(languages))
+
+def _pad(tokenizer, encoded):
+    return tokenizer.pad({"input_ids": encoded}, return_tensors="pt")
+
+# Encoder time of the current thread's generate call, accumulated by forward
+# hooks installed once per model (hooks are not added or removed per call,
+# since other threads may be running the same model)
+_encoder_time = threading.local()
+_hooks_lock = threading.Lock()
+
+def _install_encoder_timer(model):
+    encoder = model.get_encoder() if hasattr(model, "get_encoder") else None
+    if not hasattr(encoder, "register_forward_pre_hook"):
+        # e.g. onnxruntime sessions: encoder time is counted as decoding
+        return False
+    with _hooks_lock:
+        if not getattr(encoder, "_timed", False):
+            def before(module, args):
+                _encoder_time.started = time.perf_counter()
+            def after(module, args, output):
+                started = getattr(_encoder_time, "started", None)
+                if started is not None:
+                    _encoder_time.seconds = getattr(_encoder_time, "seconds", 0.0) + time.perf_counter() - started
+                    _encoder_time.started = None
+            encoder.register_forward_pre_hook(before)
+            encoder.register_forward_hook(after)
+            encoder._timed = True
+    return True
+
+def length_caps(input_lengths, max_length, length_ratio=None, length_margin=16):
+    """
+    The output length limit of each prompt: ``length_ratio`` times its
+    input tokens plus ``length_margin``, at most ``max_length`` (just
+    ``max_length`` without a ratio).
+    """
+    if not length_ratio:
+        return [max_length] * len(input_lengths)
+    return [min(max_length, int(length_ratio * n) + length_margin) for n in input_lengths]
+
+class LengthCap:
+    """
+    A stopping criterion ending each sequence at its own prompt's limit in
+    ``caps`` (rows of several beams or return sequences share their
+    prompt's), where ``max_length`` can only end a batch as a whole.
+    """
+    def __init__(self, caps):
+        self.caps = caps
+        self._limits = None
+
+    def __call__(self, input_ids, scores=None, **kwargs):
+        import torch
+        if self._limits is None or len(self._limits) != input_ids.shape[0]:
+            limits = torch.tensor(self.caps, device=input_ids.device)
+            self._limits = limits.repeat_interleave(input_ids.shape[0] // len(self.caps))
+        return input_ids.shape[1] >= self._limits
+
+class RepetitionGuard:
+    """
+    A stopping criterion ending sequences that have fallen into a loop: the
+    last ``n`` generated tokens (for any ``n`` up to ``max_ngram``) repeated
+    back to back at least ``min_repeats`` times and over at least
+    ``min_span`` tokens, so "x x x" gap runs are left alone but a phrase
+    emitted over and over until max_length is cut short.  The indices of
+    the prompts it stopped are collected in ``triggered``.
+    """
+    def __init__(self, min_span=16, max_ngram=12, min_repeats=3, pad_token_id=0, batch_size=1):
+        self.min_span = min_span
+        self.max_ngram = max_ngram
+        self.min_repeats = min_repeats
+        self.pad_token_id = pad_token_id
+        self.batch_size = batch_size
+        self.triggered = set()
+
+    def __call__(self, input_ids, scores=None, **kwargs):
+        import torch
+        # Without the decoder start token
+        generated = input_ids[:, 1:]
+        stop = torch.zeros(input_ids.shape[0], dtype=torch.bool, device=input_ids.device)
+        for n in range(1, self.max_ngram + 1):
+            copies = max(self.min_repeats, -(-self.min_span // n))
+            if generated.shape[1] < n * copies:
+                continue
+            tail = generated[:, -n * copies:].reshape(-1, copies, n)
+            stop |= (tail == tail[:, -1:, :]).all(dim=2).all(dim=1)
+        # Rows that already ended are padded, which is no loop
+        stop &= input_ids[:, -1] != self.pad_token_id
+        if stop.any():
+            rows_per_prompt = max(1, input_ids.shape[0] // self.batch_size)
+            self.triggered.update((stop.nonzero().flatten() // rows_per_prompt).tolist())
+        return stop
+
+def _generate_ids(model, input_ids, attention_mask, caps, repetition_guard, pad_token_id, **generate_kwargs):
+    # One generate call stopping each prompt at its cap or when it loops;
+    # returns the output ids and the prompts the guard stopped
+    from transformers import StoppingCriteriaList
+    criteria = StoppingCriteriaList(generate_kwargs.pop("stopping_criteria", []))
+    if len(set(caps)) > 1:
+        criteria.append(LengthCap(caps))
+    guard = None
+    if repetition_guard:
+        guard = RepetitionGuard(repetition_guard, pad_token_id=pad_token_id, batch_size=len(caps))
+        criteria.append(guard)
+    output_ids = model.generate(
+        input_ids=input_ids,
+        attention_mask=attention_mask,
+        max_length=max(caps),
+        stopping_criteria=criteria,
+        **generate_kwargs
+    )
+    return output_ids, guard.triggered if guard is not None else set()
+
+def _generate(model, tokenizer, inputs, max_length, stats=None, length_ratio=None, length_margin=16,
+              repetition_guard=None, assistant_model=None, **generate_kwargs):
+    # generate and decode one padded batch, adding the time spent, token
+    # counts, length caps and why each prompt stopped to ``stats``
+    import torch
+    timed = stats is not None and _install_encoder_timer(model)
+    _encoder_time.seconds = 0.0
+    start = time.perf_counter()
+    input_lengths = inputs["attention_mask"].sum(dim=1).tolist()
+    caps = length_caps(input_lengths, max_length, length_ratio, length_margin)
+    if assistant_model is None:
+        output_ids, triggered = _generate_ids(
+            model, inputs["input_ids"], inputs["attention_mask"], caps, repetition_guard,
+            tokenizer.pad_token_id, **generate_kwargs
+        )
+    else:
+        # Assisted generation takes one sequence at a time: generate each
+        # prompt unpadded and pad the outputs back into one batch
+        rows, triggered = [], set()
+        for i, n in enumerate(input_lengths):
+            row_ids, row_triggered = _generate_ids(
+                model, inputs["input_ids"][i:i + 1, :n], inputs["attention_mask"][i:i + 1, :n], caps[i:i + 1],
+                repetition_guard, tokenizer.pad_token_id, assistant_model=assistant_model, **generate_kwargs
+            )
+            rows.append(row_ids)
+            if row_triggered:
+                triggered.add(i)
+        width = max(row.shape[1] for row in rows)
+        output_ids = torch.cat([
+            torch.nn.functional.pad(row, (0, width - row.shape[1]), value=tokenizer.pad_token_id) for row in rows
+        ])
+    generated = time.perf_counter()
+    translations = tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+    if stats is not None:
+        encode = _encoder_time.seconds if timed else 0.0
+        seconds = stats.setdefault("seconds", dict.fromkeys(("tokenize", "encode", "decode", "detokenize"), 0.0))
+        seconds["encode"] += encode
+        seconds["decode"] += generated - start - encode
+        seconds["detokenize"] += time.perf_counter() - generated
+        stats.setdefault("input_tokens", []).extend(input_lengths)
+        stats.setdefault("output_tokens", []).extend((output_ids != tokenizer.pad_token_id).sum(dim=1).tolist())
+        stats.setdefault("length_caps", []).extend(caps)
+        rows_per_prompt = max(1, output_ids.shape[0] // len(caps))
+        reasons = stats.setdefault("stop_reasons", [])
+        for i, row in enumerate(output_ids[:, 1:].tolist()):
+            if tokenizer.eos_token_id in row:
+                reasons.append("eos")
+            elif i // rows_per_prompt in triggered:
+                reasons.append("repetition")
+            else:
+                reasons.append("length")
+        stats["assisted"] = assistant_model is not None
+    return translations
+
+def translate_batch(model, tokenizer, texts, max_length=512, stats=None, **generate_kwargs):
+    """
+    Translate a list of already-normalized prompts with a single padded
+    ``generate`` call and return the decoded strings in the same order.
+
+    Decoding options, besides the ``generate`` keyword arguments:
+    ``length_ratio`` caps each prompt's output at ``length_ratio * input
+    tokens + length_margin`` (see length_caps), ``repetition_guard`` stops
+    prompts looping over at least that many tokens (see RepetitionGuard) and
+    ``assistant_model``, a smaller model with the same vocabulary, drafts
+    tokens for assisted generation (one prompt at a time).
+
+    If ``stats`` is a dict it is filled with the seconds spent in each stage
+    ("tokenize", "encode", "decode", "detokenize"), and for every prompt its
+    input and output token count, length cap and stop reason ("eos",
+    "length" or "repetition").
+    """
+    start = time.perf_counter()
+    inputs = _pad(tokenizer, encode_prompts(tokenizer, texts))
+    if stats is not None:
+        stats.setdefault("seconds", dict.fromkeys(("tokenize", "encode", "decode", "detokenize"), 0.0))
+        stats["seconds"]["tokenize"] += time.perf_counter() - start
+    return _generate(model, tokenizer, inputs, max_length, stats, **generate_kwargs)
+
+def length_buckets(lengths, max_tokens=8192, max_batch_size=64):
+    """
+    Group indices into batches of similar length: indices are taken in order
+    of length, and a batch is closed when adding the next one would make
+    ``batch size * longest length`` (the padded size) exceed ``max_tokens``
+    or the batch reach ``max_batch_size``.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, bucket = [], []
+    for i in order:
+        # Sorted ascending, so the newcomer is the longest
+        if bucket and ((len(bucket) + 1) * lengths[i] > max_tokens or len(bucket) >= max_batch_size):
+            buckets.append(bucket)
+            bucket = []
+        bucket.append(i)
+    if bucket:
+        buckets.append(bucket)
+    return buckets
+
+def translate_bucketed(model, tokenizer, texts, max_tokens=8192, max_batch_size=64, max_length=512,
+                       length_ratio=None, length_margin=16, stats=None, **generate_kwargs):
+    """
+    Translate any number of normalized prompts with little padding.
+
+    All prompts are tokenized in one call and split into length buckets by
+    a padded-token budget (see length_buckets); each bucket is padded to its
+    own longest prompt and generated separately, ending when its last
+    prompt reaches its own length cap (see translate_batch for that and the
+    other options).  Translations (and ``stats``) are returned in the
+    original order.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    start = time.perf_counter()
+    encoded = encode_prompts(tokenizer, texts)
+    tokenize_seconds = time.perf_counter() - start
+    lengths = [len(ids) for ids in encoded]
+
+    translations = [None] * len(texts)
+    per_prompt = {name: [None] * len(texts) for name in ("input_tokens", "output_tokens", "length_caps", "stop_reasons")}
+    seconds = dict.fromkeys(("tokenize", "encode", "decode", "detokenize"), 0.0)
+    seconds["tokenize"] = tokenize_seconds
+    for bucket in length_buckets(lengths, max_tokens, max_batch_size):
+        start = time.perf_counter()
+        inputs = _pad(tokenizer, [encoded[i] for i in bucket])
+        seconds["tokenize"] += time.perf_counter() - start
+        bucket_stats = {} if stats is not None else None
+        bucket_translations = _generate(
+            model, tokenizer, inputs, max_length, bucket_stats,
+            length_ratio=length_ratio, length_margin=length_margin, **generate_kwargs
+        )
+        for i, translation in zip(bucket, bucket_translations):
+            translations[i] = translation
+        if bucket_stats is not None:
+            for stage, value in bucket_stats["seconds"].items():
+                seconds[stage] += value
+            for name, values in per_prompt.items():
+                for i, value in zip(bucket, bucket_stats[name]):
+                    values[i] = value
+            stats["assisted"] = bucket_stats["assisted"]
+    if stats is not None:
+        stats["seconds"] = seconds
+        stats.update(per_prompt)
+    return translations
+
+def stream_translation(model, tokenizer, prompt, cancel_event=None, max_length=512, length_ratio=None,
+                       length_margin=16, repetition_guard=None, **generate_kwargs):
+    """
+    Yield the translation of one normalized prompt as decoded text pieces,
+    as ``generate`` produces tokens.  The decoding options are those of
+    translate_batch.
+
+    Generation runs in a background thread.  Setting ``cancel_event`` (or
+    closing this generator, e.g. when the client disconnects) stops it at the
+    next decoding step.
+    """
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    cancel_event = cancel_event or threading.Event()
+
+    class Cancelled(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), cancel_event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    inputs = _pad(tokenizer, encode_prompts(tokenizer, [prompt]))
+    max_length = length_caps([inputs["input_ids"].shape[1]], max_length, length_ratio, length_margin)[0]
+    criteria = StoppingCriteriaList([Cancelled()])
+    if repetition_guard:
+        criteria.append(RepetitionGuard(repetition_guard, pad_token_id=tokenizer.pad_token_id))
+    errors = []
+
+    def generate():
+        try:
+            model.generate(
+                input_ids=inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                max_length=max_length,
+                streamer=streamer,
+                stopping_criteria=criteria,
+                **generate_kwargs
+            )
+        except Exception as e:
+            # Unblock the consumer; the error is re-raised below
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=generate, name="stream-generate", daemon=True)
+    thread.start()
+    try:
+        for text in streamer:
+            if text:
+                yield text
+        if errors:
+            raise errors[0]
+    finally:
+        cancel_event.set()
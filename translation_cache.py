@@ -0,0 +1,155 @@
+import hashlib, json, os, sqlite3, threading, time
+from collections import OrderedDict
+
+def make_cache_key(prompt, model_name, **generate_kwargs):
+    """
+    Key a translation on the normalized prompt, the model that produced it and
+    the generation parameters used.
+    """
+    payload = json.dumps([model_name, prompt, sorted(generate_kwargs.items())], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class TranslationCache:
+    """
+    In-process LRU cache of translations with a size limit and a TTL (in
+    seconds; ``None`` disables expiry).  Thread-safe.
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """
+        Return the cached translation for ``key``, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+class SQLiteTranslationCache(TranslationCache):
+    """
+    The same cache backed by a SQLite file, so cached translations survive
+    restarts.  Least recently used rows are evicted past ``maxsize``.
+
+    SQLite connections must not be carried across fork(), so a process
+    forked from the one that opened the cache (e.g. a gunicorn worker of a
+    preloaded app) opens its own connection on first use.
+    """
+    def __init__(self, path, maxsize=100000, ttl=None):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.path = path
+        self._conn = None
+        self._pid = None
+        with self._lock, self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)")
+            self._size = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def _connection(self):
+        # Called with the lock held
+        if self._pid != os.getpid():
+            # A connection inherited across fork() is replaced, never used
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._pid = os.getpid()
+        return self._conn
+
+    def reopen(self):
+        """
+        Open this process's own connection (and lock) now, e.g. right after
+        forking, rather than on first use.
+        """
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            row = conn.execute("SELECT value, created FROM translations WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM translations WHERE key = ?", (key,))
+                self._size -= 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE translations SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock, self._connection() as conn:
+            updated = conn.execute(
+                "UPDATE translations SET value = ?, created = ?, accessed = ? WHERE key = ?",
+                (value, now, now, key)
+            ).rowcount
+            if updated:
+                return
+            conn.execute(
+                "INSERT INTO translations (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            self._size += 1
+            if self._size > self.maxsize:
+                conn.execute(
+                    "DELETE FROM translations WHERE key IN ("
+                    "SELECT key FROM translations ORDER BY accessed LIMIT ?)",
+                    (self._size - self.maxsize,)
+                )
+                self._size = self.maxsize
+
+    def clear(self):
+        with self._lock, self._connection() as conn:
+            conn.execute("DELETE FROM translations")
+            self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def stats(self):
+        stats = super().stats()
+        stats["backend"] = "sqlite"
+        stats["path"] = self.path
+        return stats